@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
+# The ASGI entry point serves the async versions of the read-heavy views (store.async_views)
+os.environ.setdefault('STORE_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
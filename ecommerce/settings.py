@@ -1,5 +1,7 @@
 from pathlib import Path
+import hashlib
 import os
+import tempfile
 
 # ==============================
 # 📁 BASE DIRECTORY
@@ -39,11 +41,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files
+    'store.middleware.PerformanceMiddleware',  # Server-Timing + perf log (STORE_INSTRUMENTATION)
+    'django.middleware.gzip.GZipMiddleware',  # Compress HTML responses
+    'django.middleware.http.ConditionalGetMiddleware',  # ETag / Last-Modified → 304
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'store.middleware.VisitTrackingMiddleware',  # Visit counter in a signed cookie
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -68,6 +74,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'store.context_processors.cart_item_count',
+                'store.context_processors.category_navigation',
             ],
         },
     },
@@ -80,10 +87,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL lets readers run alongside the writer; IMMEDIATE transactions take the write
+        # lock up front, so concurrent writers wait (up to `timeout` s) instead of failing.
+        # synchronous=NORMAL trades durability for throughput: a power loss can drop the
+        # last commits (the file stays consistent).
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than :memory:, so multi-threaded tests run against WAL too. Named after
+        # the checkout, so test runs from different checkouts don't delete each other's database.
+        'TEST': {
+            'NAME': os.path.join(
+                tempfile.gettempdir(), f'ecommerce-test-{hashlib.md5(bytes(BASE_DIR)).hexdigest()[:8]}.sqlite3',
+            ),
+        },
     }
 }
 # Use PostgreSQL on Render by overriding in Render Dashboard
 
+# ==============================
+# ⚡ CACHE
+# ==============================
+# Set REDIS_URL in production so every gunicorn worker shares one cache
+# (cart state, product cards and anonymous pages are invalidated through it).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ecommerce',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
 # ==============================
 # 🔐 PASSWORD VALIDATION
 # ==============================
@@ -130,3 +174,32 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', 'yourpassword')
 # 🆔 PRIMARY KEY
 # ==============================
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# ==============================
+# 🛍️ STORE
+# ==============================
+STORE_PAGE_SIZE = 24  # Products per catalog page (keyset-paginated)
+STORE_PAGE_CACHE_TIMEOUT = 60 * 10  # Server-side cache of anonymous catalog pages (seconds)
+STORE_PAGE_CACHE_MAX_AGE = 60  # Browser/CDN Cache-Control max-age for those pages (seconds)
+STORE_RESERVATION_TTL = 60 * 15  # How long opening checkout holds the cart's stock (seconds)
+# Serve home/product/categories/search from store.async_views (set by ecommerce/asgi.py)
+STORE_ASYNC_VIEWS = os.environ.get('STORE_ASYNC_VIEWS', 'False') == 'True'
+
+# Per-request performance instrumentation (Server-Timing header + `store.performance` log)
+STORE_INSTRUMENTATION = os.environ.get('STORE_INSTRUMENTATION', str(DEBUG)) == 'True'
+STORE_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('STORE_INSTRUMENTATION_SAMPLE_RATE', '1.0'))
+STORE_DUPLICATE_QUERY_THRESHOLD = 3  # Same query shape this many times in one request is logged as a likely N+1
+
+# ==============================
+# 📝 LOGGING
+# ==============================
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'store.performance': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
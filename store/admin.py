@@ -1,26 +1,244 @@
-from django.contrib import admin
-from .models import Category, Customer, Product, Order, CartItem, OrderGroup, OrderItem, Review
+from decimal import Decimal
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Round
+from django.http import HttpResponseBadRequest
+from django.urls import path
+from .caching import bump_catalog_version
+from .inventory import invalidate_out_of_stock, release_holds
+from .models import (
+    Category, Customer, Product, Order, CartItem, OrderGroup, OrderItem, Review, OutboxEmail, Wishlist,
+    Inventory, StockReservation,
+)
+from .order_export import FORMATS, filter_by_date, parse_date_range, streaming_export
+from .pagination import EstimatedCountPaginator
+from .search import ranked_matches
+from .user_state import invalidate_user_state
+
+DEFAULT_SALE_DISCOUNT = Decimal('0.80')  # "Put on sale" price when a product has no valid sale_price yet
+
+
+# Base for tables that grow to millions of rows: estimated counts, no second
+# full-table COUNT(*) for "N total", and FK fields rendered as autocomplete
+# widgets instead of a <select> holding every row
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ['-pk']
+
+
+# Admin customization for Category (searchable so Product can autocomplete it)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+
+# Admin customization for Product: search goes through the trigram index / SKU, not LIKE scans
+class ProductAdmin(LargeTableAdmin):
+    list_display = ['name', 'sku', 'category', 'price', 'on_sale', 'sale_price', 'rating_avg']
+    list_select_related = ['category']
+    list_filter = ['on_sale', 'category']
+    search_fields = ['=sku']
+    search_help_text = "Product name or description words, or an exact SKU."
+    autocomplete_fields = ['category']
+    actions = ['put_on_sale', 'end_sale']
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = ranked_matches(term).values('product_id')
+        return queryset.filter(Q(sku=term) | Q(pk__in=matches)), False
+
+    @admin.action(description="Put selected products on sale")
+    def put_on_sale(self, request, queryset):
+        # Bulk UPDATEs bypass Product.save(), so effective_price and the catalog stamp are set here
+        queryset.filter(Q(sale_price__lte=0) | Q(sale_price__gte=F('price'))).update(
+            sale_price=Round(F('price') * DEFAULT_SALE_DISCOUNT, 2)
+        )
+        updated = queryset.update(on_sale=True, effective_price=F('sale_price'))
+        bump_catalog_version()
+        self.message_user(request, f"{updated} product(s) put on sale.", messages.SUCCESS)
+
+    @admin.action(description="End sale for selected products")
+    def end_sale(self, request, queryset):
+        updated = queryset.update(on_sale=False, effective_price=F('price'))
+        bump_catalog_version()
+        self.message_user(request, f"{updated} product(s) taken off sale.", messages.SUCCESS)
+
 
 # Inline view of OrderItem inside OrderGroup admin panel
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    autocomplete_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
-# Admin customization for OrderGroup
-class OrderGroupAdmin(admin.ModelAdmin):
+
+# Admin customization for OrderGroup, with streaming CSV/JSONL export of orders + line items
+class OrderGroupAdmin(LargeTableAdmin):
     list_display = ['id', 'user', 'created_at', 'total_price', 'is_paid']
+    list_select_related = ['user']
+    list_filter = ['is_paid', 'created_at']
+    search_fields = ['=id', '=user__username']
+    autocomplete_fields = ['user']
     inlines = [OrderItemInline]
+    actions = ['mark_paid', 'mark_unpaid', 'export_csv', 'export_jsonl']
 
-# Register your models here
-admin.site.register(Category)
-admin.site.register(Customer)
-admin.site.register(Product)
-admin.site.register(Order)        # This is your old single-item order model
-admin.site.register(CartItem)
-admin.site.register(OrderGroup, OrderGroupAdmin)
+    @admin.action(description="Mark selected orders as paid")
+    def mark_paid(self, request, queryset):
+        updated = queryset.update(is_paid=True)
+        self.message_user(request, f"{updated} order(s) marked as paid.", messages.SUCCESS)
+
+    @admin.action(description="Mark selected orders as unpaid")
+    def mark_unpaid(self, request, queryset):
+        updated = queryset.update(is_paid=False)
+        self.message_user(request, f"{updated} order(s) marked as unpaid.", messages.SUCCESS)
+
+    @admin.action(description="Export selected orders as CSV")
+    def export_csv(self, request, queryset):
+        return streaming_export(queryset, 'csv')
+
+    @admin.action(description="Export selected orders as JSONL")
+    def export_jsonl(self, request, queryset):
+        return streaming_export(queryset, 'jsonl')
+
+    def get_urls(self):
+        return [
+            path('export/', self.admin_site.admin_view(self.export_view), name='store_ordergroup_export'),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        """``export/?start=YYYY-MM-DD&end=YYYY-MM-DD&format=csv|jsonl`` streams every order in the range."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        fmt = request.GET.get('format', 'csv')
+        try:
+            start, end = parse_date_range(request.GET)
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+        if fmt not in FORMATS:
+            return HttpResponseBadRequest(f"format must be one of: {', '.join(FORMATS)}")
+        filename = '-'.join(['orders', *(str(day) for day in (start, end) if day)])
+        return streaming_export(filter_by_date(self.get_queryset(request), start, end), fmt, filename)
+
+
+# Cart and wishlist edits must refresh the owner's cached cart/wishlist state
+class UserStateAdmin(LargeTableAdmin):
+    list_select_related = ['user', 'product']
+    autocomplete_fields = ['user', 'product']
+    search_fields = ['=user__username']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_user_state(obj.user_id)
+        if change and 'user' in form.changed_data:
+            invalidate_user_state(form.initial['user'])
 
-from .models import Wishlist  # ✅ Make sure this import is added
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_user_state(obj.user_id)
 
-admin.site.register(Wishlist)
-admin.site.register(Review)
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            invalidate_user_state(user_id)
 
+
+# Admin customization for CartItem
+class CartItemAdmin(UserStateAdmin):
+    list_display = ['user', 'product', 'quantity', 'added_on']
+
+
+# Admin customization for Wishlist
+class WishlistAdmin(UserStateAdmin):
+    list_display = ['user', 'product', 'added_on']
+
+
+# Admin customization for Review (rating aggregates are kept in sync by store.signals)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ['product', 'user', 'rating', 'created_at']
+    list_select_related = ['product', 'user']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['product', 'user']
+
+
+# Admin customization for Inventory (checkout only ever changes stock with conditional UPDATEs, see store.inventory)
+class InventoryAdmin(LargeTableAdmin):
+    list_display = ['product', 'on_hand', 'reserved', 'available']
+    list_select_related = ['product']
+    search_fields = ['=product__sku']
+    autocomplete_fields = ['product']
+
+    def get_readonly_fields(self, request, obj=None):
+        return ['product'] if obj else []
+
+    def save_model(self, request, obj, form, change):
+        if change and 'on_hand' in form.changed_data:
+            # Applied as a delta so units sold while the form was open aren't written back
+            delta = obj.on_hand - form.initial['on_hand']
+            Inventory.objects.filter(pk=obj.pk).update(on_hand=Greatest(F('on_hand') + delta, 0))
+            obj.refresh_from_db(fields=['on_hand'])
+        elif not change:
+            super().save_model(request, obj, form, change)
+        invalidate_out_of_stock()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_out_of_stock()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_out_of_stock()
+
+
+# Checkout stock holds; expired ones are released by `manage.py release_reservations`
+class StockReservationAdmin(LargeTableAdmin):
+    list_display = ['user', 'product', 'quantity', 'expires_at']
+    list_select_related = ['user', 'product']
+    search_fields = ['=user__username']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # Deleting a hold must also give its units back to Inventory.reserved
+    def delete_model(self, request, obj):
+        release_holds(StockReservation.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        release_holds(queryset)
+
+
+# Admin customization for the legacy single-item Order
+class OrderAdmin(LargeTableAdmin):
+    list_display = ['id', 'product', 'customer', 'quantity', 'date']
+    list_select_related = ['product', 'customer']
+    raw_id_fields = ['product', 'customer']
+
+
+# Admin customization for the email outbox (delivery is done by `manage.py run_outbox`)
+class OutboxEmailAdmin(LargeTableAdmin):
+    list_display = ['id', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+
+# Register your models here
+admin.site.register(Category, CategoryAdmin)
+admin.site.register(Customer)
+admin.site.register(Product, ProductAdmin)
+admin.site.register(Order, OrderAdmin)        # This is your old single-item order model
+admin.site.register(CartItem, CartItemAdmin)
+admin.site.register(OrderGroup, OrderGroupAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
+admin.site.register(Wishlist, WishlistAdmin)
+admin.site.register(Review, ReviewAdmin)
+admin.site.register(Inventory, InventoryAdmin)
+admin.site.register(StockReservation, StockReservationAdmin)
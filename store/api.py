@@ -0,0 +1,214 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .caching import catalog_version
+from .images import FORMATS as RENDITION_FORMATS, rendition_name, rendition_widths
+from .models import Category, Product, Review
+from .pagination import DEFAULT_SORT, SORT_OPTIONS, keyset_page
+
+# =====================
+# 📡 JSON Catalog API (v1)
+# =====================
+# Read-only JSON over products, categories and reviews for the mobile app and
+# partner feeds. Rows are fetched with values() and serialized by one shared
+# encoder, so no model instances are built. Every page is one indexed query:
+# list endpoints use the same keyset cursors as the HTML catalog, and
+# ``?fields=`` narrows the SELECT to the requested columns. ETags come from the
+# catalog version stamp, so a revalidation returns 304 before touching the
+# database.
+
+API_VERSION = 'v1'
+MAX_LIMIT = 100
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def _image(row):
+    if not row['image']:
+        return None
+    image = {
+        'url': default_storage.url(row['image']),
+        'width': row['image_width'],
+        'height': row['image_height'],
+        'renditions': {},
+    }
+    if row['image_width'] and row['rendition_source'] == row['image']:
+        image['renditions'] = {
+            width: {ext: default_storage.url(rendition_name(row['image'], width, ext)) for ext in RENDITION_FORMATS}
+            for width in rendition_widths(row['image_width'])
+        }
+    return image
+
+
+def _rating(row):
+    return {
+        'average': round(row['rating_avg'], 2),
+        'count': row['rating_count'],
+        'histogram': {star: row[f'rating_{star}'] for star in range(5, 0, -1)},
+    }
+
+
+# public field -> (columns to SELECT, builder from the values() row; None copies the column)
+PRODUCT_FIELDS = {
+    'id': (['id'], None),
+    'sku': (['sku'], None),
+    'name': (['name'], None),
+    'description': (['description'], None),
+    'price': (['price'], None),
+    'on_sale': (['on_sale'], None),
+    'sale_price': (['sale_price'], None),
+    'effective_price': (['effective_price'], None),
+    'category': (['category_id', 'category__name'], lambda row: {'id': row['category_id'], 'name': row['category__name']}),
+    'image': (['image', 'image_width', 'image_height', 'rendition_source'], _image),
+    'rating': (['rating_avg', 'rating_count', *(f'rating_{star}' for star in range(1, 6))], _rating),
+}
+CATEGORY_FIELDS = {
+    'id': (['id'], None),
+    'name': (['name'], None),
+}
+REVIEW_FIELDS = {
+    'id': (['id'], None),
+    'product': (['product_id'], None),
+    'user': (['user__username'], None),
+    'rating': (['rating'], None),
+    'comment': (['comment'], None),
+    'created_at': (['created_at'], None),
+}
+
+
+class FieldsetError(ValueError):
+    pass
+
+
+class Fieldset:
+    """The columns to SELECT and the serializer for a ``?fields=a,b`` request."""
+
+    def __init__(self, spec, requested=None, always=()):
+        names = list(spec) if not requested else [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in spec]
+        if unknown:
+            raise FieldsetError(f"unknown field(s): {', '.join(unknown)}; available: {', '.join(spec)}")
+        self.names = list(dict.fromkeys(names))
+        columns = [column for name in self.names for column in spec[name][0]]
+        self.columns = list(dict.fromkeys([*columns, *always]))
+        self.builders = [
+            (name, spec[name][1] or (lambda row, column=spec[name][0][0]: row[column]))
+            for name in self.names
+        ]
+
+    def serialize(self, row):
+        return {name: build(row) for name, build in self.builders}
+
+
+def _json(payload, status=200):
+    return HttpResponse(_encoder.encode(payload), content_type='application/json', status=status)
+
+
+def _error(message, status=400):
+    return _json({'error': message}, status=status)
+
+
+def _etag(request, *args, **kwargs):
+    raw = f'{API_VERSION}:{catalog_version(request)}:{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.STORE_PAGE_SIZE))
+    except ValueError:
+        limit = settings.STORE_PAGE_SIZE
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def api_view(view):
+    """GET/HEAD only, catalog-version ETag (304 without queries) and public caching."""
+    conditional = condition(etag_func=_etag)(view)
+
+    @wraps(view)
+    @require_safe
+    def wrapped(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        if response.status_code == 200:
+            patch_cache_control(response, public=True, max_age=settings.STORE_PAGE_CACHE_MAX_AGE)
+        elif response.status_code != 304:
+            # Only a 200 may carry the catalog ETag; revalidating an error with it would earn a 304
+            del response['ETag']
+        return response
+    return wrapped
+
+
+def _list_response(page, fieldset):
+    return _json({
+        'results': [fieldset.serialize(row) for row in page],
+        'sort': page.sort,
+        'next_cursor': page.next_cursor,
+    })
+
+
+# 🔹 Products
+@api_view
+def products(request):
+    """``?category=<id>&sort=<key>&cursor=<c>&limit=<n>&fields=a,b``"""
+    sort = request.GET.get('sort')
+    key = SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])[0]
+    try:
+        # The sort key and id are always selected so the next cursor can be built
+        fieldset = Fieldset(PRODUCT_FIELDS, request.GET.get('fields'), always=['id', *filter(None, [key])])
+    except FieldsetError as exc:
+        return _error(str(exc))
+
+    queryset = Product.objects.all()
+    category = request.GET.get('category')
+    if category:
+        if not category.isdigit():
+            return _error("category must be a category id")
+        queryset = queryset.filter(category_id=category)
+
+    page = keyset_page(queryset.values(*fieldset.columns), sort=sort, cursor=request.GET.get('cursor'), page_size=_limit(request))
+    return _list_response(page, fieldset)
+
+
+@api_view
+def product(request, pk):
+    try:
+        fieldset = Fieldset(PRODUCT_FIELDS, request.GET.get('fields'))
+    except FieldsetError as exc:
+        return _error(str(exc))
+    row = Product.objects.filter(pk=pk).values(*fieldset.columns).first()
+    if row is None:
+        return _error("product not found", status=404)
+    return _json(fieldset.serialize(row))
+
+
+@api_view
+def product_reviews(request, pk):
+    """Newest reviews first; ``?cursor=<c>&limit=<n>&fields=a,b``"""
+    try:
+        fieldset = Fieldset(REVIEW_FIELDS, request.GET.get('fields'), always=['id'])
+    except FieldsetError as exc:
+        return _error(str(exc))
+    queryset = Review.objects.filter(product_id=pk).values(*fieldset.columns)
+    page = keyset_page(queryset, sort='newest', cursor=request.GET.get('cursor'), page_size=_limit(request))
+    # Only an empty first page needs to tell "no reviews yet" from "no such product"
+    if not page.object_list and not request.GET.get('cursor') and not Product.objects.filter(pk=pk).exists():
+        return _error("product not found", status=404)
+    return _list_response(page, fieldset)
+
+
+# 🔹 Categories
+@api_view
+def categories(request):
+    try:
+        fieldset = Fieldset(CATEGORY_FIELDS, request.GET.get('fields'))
+    except FieldsetError as exc:
+        return _error(str(exc))
+    rows = Category.objects.order_by('name', 'id').values(*fieldset.columns)
+    return _json({'results': [fieldset.serialize(row) for row in rows]})
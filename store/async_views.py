@@ -0,0 +1,156 @@
+import asyncio
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.shortcuts import aget_object_or_404, render
+
+from .caching import anonymous_page_cache
+from .facets import FacetFilters, afacet_counts, build_facets
+from .navigation import acategory_nav, get_nav_category_or_404
+from .models import Product, Review
+from .pagination import akeyset_page
+from .search import asearch_page, matching_products
+from .inventory import aout_of_stock_ids, out_of_stock_ids
+from .user_state import aget_user_state
+
+# =====================
+# ⚡ Async read views
+# =====================
+# Async versions of the read-heavy storefront views, served instead of the ones
+# in store.views when STORE_ASYNC_VIEWS is on (the ASGI profile sets it). They
+# take the same URLs and render the same templates. Independent lookups (page
+# of products, cart/wishlist state, reviews, ...) are gathered, but this is not
+# concurrent yet: the async ORM hands every query to the same single thread, and
+# render() plus the sync cache reads inside templates still block the event loop.
+# That is why production (render.yaml) stays on WSGI and this path is opt-in.
+# Templates are rendered only after every queryset and the request user are
+# resolved, since touching the database from async code needs the async ORM.
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _request_state(request):
+    # The navbar (sync context processor) and the product card buttons (sync template tag)
+    # read the category list and the sold-out set, so both are preloaded here
+    state, *_ = await asyncio.gather(aget_user_state(request), acategory_nav(request), aout_of_stock_ids(request))
+    return state
+
+
+def _product_page(request, queryset):
+    return akeyset_page(queryset, sort=request.GET.get('sort'), cursor=request.GET.get('cursor'))
+
+
+# 🔹 Home Page
+@anonymous_page_cache
+async def home(request):
+    page, state = await asyncio.gather(
+        _product_page(request, Product.objects.select_related('category')),
+        _request_state(request),
+    )
+    return render(request, "store/home.html", {
+        'Products': page,
+        'page': page,
+        'cart_products': state.cart,
+        'wishlist_products': state.wishlist
+    })
+
+
+# 🔹 Product Grid Fragment (infinite scroll)
+@anonymous_page_cache
+async def product_page(request):
+    page, state = await asyncio.gather(
+        _product_page(request, Product.objects.select_related('category')),
+        _request_state(request),
+    )
+    return render(request, "store/product_cards.html", {
+        'Products': page,
+        'page': page,
+        'cart_products': state.cart,
+        'wishlist_products': state.wishlist
+    })
+
+
+# 🔹 Product Detail Page
+@anonymous_page_cache
+async def product(request, pk):
+    product, reviews, state = await asyncio.gather(
+        aget_object_or_404(Product.objects.select_related('category'), id=pk),
+        _alist(Review.objects.filter(product_id=pk).select_related('user').order_by('-created_at')),
+        _request_state(request),
+    )
+    return render(request, "store/product.html", {
+        'product': product,
+        'is_in_cart': product.id in state.cart,
+        'cart_quantity': state.cart_quantities.get(product.id, 0),
+        'is_in_wishlist': product.id in state.wishlist,
+        'is_out_of_stock': product.id in out_of_stock_ids(request),
+        'reviews': reviews,
+        'average_rating': product.average_rating
+    })
+
+
+# 🔹 Categories
+@anonymous_page_cache
+async def categories(request, category_id=None):
+    current_category = None
+    products = []
+    filters = FacetFilters(request.GET, with_category=False)
+    facets = []
+    lookups = [acategory_nav(request), aget_user_state(request), aout_of_stock_ids(request)]
+    if category_id:
+        in_category = Product.objects.filter(category_id=category_id)
+        lookups += [
+            _product_page(request, in_category.filter(filters.q()).select_related('category')),
+            afacet_counts(request, f'category:{category_id}', in_category, filters),
+        ]
+    all_categories, state, _, *selected = await asyncio.gather(*lookups)
+    if category_id:
+        current_category = get_nav_category_or_404(all_categories, category_id)
+        products, counts = selected
+        facets = build_facets(counts, filters, extra=[('sort', products.sort)])
+
+    return render(request, "store/categories.html", {
+        'all_categories': all_categories,
+        'current_category': current_category,
+        'products': products,
+        'filters': filters,
+        'facets': facets,
+        'wishlist_products': state.wishlist,
+        'cart_products': state.cart
+    })
+
+
+# 🔍 Search
+@anonymous_page_cache
+async def search_results(request):
+    query = request.GET.get('q', '').strip()
+
+    page_obj = None
+    results = []
+    filters = FacetFilters(request.GET)
+    facets = []
+    if query:
+        counts, state = await asyncio.gather(
+            afacet_counts(request, f'search:{query}', matching_products(query), filters),
+            _request_state(request),
+        )
+        facets = build_facets(counts, filters, extra=[('q', query)])
+        page_obj = await asearch_page(
+            query, request.GET.get('page'), settings.STORE_PAGE_SIZE, filters.q('product__'), count=counts['count_total'],
+        )
+        results = page_obj.object_list
+    else:
+        state = await _request_state(request)
+
+    return render(request, 'store/search_results.html', {
+        'query': query,
+        'results': results,
+        'page_obj': page_obj,
+        'filters': filters,
+        'facets': facets,
+        'base_query': urlencode({'q': query}),
+        'wishlist_products': state.wishlist,
+        'cart_products': state.cart
+    })
@@ -0,0 +1,124 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers, set_response_etag
+from django.utils.http import http_date
+
+# =====================
+# 🏷️ Catalog Version Stamp
+# =====================
+# A single opaque token that changes whenever a Product, Category or Review changes.
+# Cached fragments include it in their key, so a bump makes every stale entry
+# unreachable at once instead of deleting keys one by one.
+
+CATALOG_VERSION_KEY = 'store:catalog_version'
+
+
+def catalog_version(request=None):
+    """Current catalog version (memoized on ``request`` when one is given)."""
+    version = getattr(request, '_store_catalog_version', None)
+    if version is None:
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(CATALOG_VERSION_KEY)
+        if request is not None:
+            request._store_catalog_version = version
+    return version
+
+
+async def acatalog_version(request=None):
+    """Async catalog_version()."""
+    version = getattr(request, '_store_catalog_version', None)
+    if version is None:
+        version = await cache.aget(CATALOG_VERSION_KEY)
+        if version is None:
+            await cache.aadd(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+            version = await cache.aget(CATALOG_VERSION_KEY)
+        if request is not None:
+            request._store_catalog_version = version
+    return version
+
+
+def bump_catalog_version():
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+# =====================
+# 📄 Anonymous Page Cache
+# =====================
+# Logged-out visitors without a session or pending messages all see the same
+# HTML for a given URL, so those responses are cached whole (keyed by path,
+# query string and catalog version) with an ETag and Last-Modified for 304s.
+
+
+def _is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+        and not request.user.is_authenticated
+    )
+
+
+def _is_cacheable_response(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def _page_key(request, version):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'store:page:{version}:{path}'
+
+
+def _prepare_for_cache(response):
+    set_response_etag(response)
+    response['Last-Modified'] = http_date()
+    patch_cache_control(response, public=True, max_age=settings.STORE_PAGE_CACHE_MAX_AGE)
+    patch_vary_headers(response, ['Cookie'])
+
+
+def anonymous_page_cache(view):
+    if iscoroutinefunction(view):
+        return _async_anonymous_page_cache(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        key = _page_key(request, catalog_version(request))
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if not _is_cacheable_response(response):
+                return response
+            _prepare_for_cache(response)
+            cache.set(key, response, settings.STORE_PAGE_CACHE_TIMEOUT)
+        return response
+    return wrapped
+
+
+def _async_anonymous_page_cache(view):
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        # Resolve the user up front: the lazy request.user would query synchronously
+        request.user = await request.auser()
+        if not _is_cacheable_request(request):
+            return await view(request, *args, **kwargs)
+
+        key = _page_key(request, await acatalog_version(request))
+        response = await cache.aget(key)
+        if response is None:
+            response = await view(request, *args, **kwargs)
+            if not _is_cacheable_response(response):
+                return response
+            _prepare_for_cache(response)
+            await cache.aset(key, response, settings.STORE_PAGE_CACHE_TIMEOUT)
+        return response
+    return wrapped
@@ -0,0 +1,156 @@
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .expressions import effective_price
+from .models import CartItem
+
+# =====================
+# 🛒 Cart Summary
+# =====================
+# One place that prices a cart. Unit prices honour on_sale/sale_price and line
+# totals are computed by the database, so the cart page, checkout, order
+# placement and the navbar badge all agree on the numbers.
+
+
+def cart_lines(user_id):
+    """The user's CartItems annotated with ``unit_price`` and ``line_total``."""
+    return (
+        CartItem.objects.filter(user_id=user_id)
+        .annotate(unit_price=effective_price('product__'))
+        .annotate(line_total=ExpressionWrapper(
+            F('quantity') * F('unit_price'),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ))
+        .order_by('added_on', 'id')
+    )
+
+
+class CartSummary:
+    def __init__(self, lines):
+        self.lines = lines
+        self.subtotal = sum((line.line_total for line in lines), Decimal('0.00'))
+        self.item_count = sum(line.quantity for line in lines)
+
+    @property
+    def line_count(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+
+def cart_summary(user_id):
+    """Priced cart lines (with their products) and totals, in a single query."""
+    return CartSummary(list(cart_lines(user_id).select_related('product')))
+
+
+# =====================
+# ✏️ Cart Mutations
+# =====================
+# Every change is a conditional statement that the database evaluates against
+# the current row, e.g. an upsert adding to the stored quantity or
+# ``quantity = MAX(quantity - n, 0)``. Concurrent clicks and tabs therefore
+# can't overwrite each other the way a read-modify-write save() does. Callers
+# must still call user_state.invalidate_user_state() afterwards.
+
+
+def _upsert_sql():
+    quote = connection.ops.quote_name
+    table, user, product, quantity, added_on = (
+        quote(name) for name in (CartItem._meta.db_table, 'user_id', 'product_id', 'quantity', 'added_on')
+    )
+    return (
+        f'INSERT INTO {table} ({user}, {product}, {quantity}, {added_on}) VALUES (%s, %s, %s, %s) '
+        f'ON CONFLICT ({user}, {product}) DO UPDATE SET {quantity} = {table}.{quantity} + excluded.{quantity}'
+    )
+
+
+def add_cart_quantities(user_id, quantities):
+    """
+    Add ``{product_id: n}`` to the user's cart: one INSERT ... ON CONFLICT DO UPDATE per line.
+
+    New lines are created and existing ones grow by ``n``, atomically.
+    """
+    added_on = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), [
+            (user_id, product_id, quantity, added_on) for product_id, quantity in quantities.items()
+        ])
+
+
+def remove_cart_quantity(lines, quantity=1):
+    """Take ``quantity`` off every CartItem in ``lines`` and delete those that reach zero; returns the rows matched."""
+    with transaction.atomic():
+        matched = lines.update(quantity=Greatest(F('quantity') - quantity, 0))
+        if matched:
+            lines.filter(quantity=0).delete()
+    return matched
+
+
+def apply_cart_changes(user_id, deltas=None, quantities=None):
+    """
+    Apply many line changes in one transaction.
+
+    ``deltas`` maps product ids to a quantity to add (or, when negative, remove);
+    ``quantities`` maps product ids to an absolute quantity, 0 dropping the line.
+    """
+    deltas = deltas or {}
+    quantities = quantities or {}
+    lines = CartItem.objects.filter(user_id=user_id)
+    with transaction.atomic():
+        increments = {product_id: n for product_id, n in deltas.items() if n > 0}
+        if increments:
+            add_cart_quantities(user_id, increments)
+        for product_id, n in deltas.items():
+            if n < 0:
+                lines.filter(product_id=product_id).update(quantity=Greatest(F('quantity') + n, 0))
+        kept = {product_id: n for product_id, n in quantities.items() if n > 0}
+        if kept:
+            CartItem.objects.bulk_create(
+                [CartItem(user_id=user_id, product_id=product_id, quantity=n) for product_id, n in kept.items()],
+                update_conflicts=True, unique_fields=['user', 'product'], update_fields=['quantity'],
+            )
+        dropped = [product_id for product_id, n in quantities.items() if n == 0]
+        lines.filter(Q(quantity=0) | Q(product_id__in=dropped)).delete()
+
+
+MAX_BATCH_LINES = 100
+# Per line, so one request can't push a quantity past the database's integer range
+MAX_LINE_QUANTITY = 1000
+
+
+def parse_cart_changes(payload):
+    """
+    ``(deltas, quantities)`` from ``{"lines": [{"product_id": 1, "delta": 2}, {"product_id": 3, "quantity": 0}]}``.
+
+    Raises ValueError on malformed input.
+    """
+    lines = payload.get('lines') if isinstance(payload, dict) else None
+    if not isinstance(lines, list) or not lines:
+        raise ValueError("lines must be a non-empty list")
+    if len(lines) > MAX_BATCH_LINES:
+        raise ValueError(f"at most {MAX_BATCH_LINES} lines per batch")
+    deltas, quantities = {}, {}
+    for line in lines:
+        if not isinstance(line, dict) or not _is_int(line.get('product_id')) or ('delta' in line) == ('quantity' in line):
+            raise ValueError("each line needs an integer product_id and exactly one of delta or quantity")
+        product_id = line['product_id']
+        if 'delta' in line:
+            if not _is_int(line['delta']) or abs(line['delta']) > MAX_LINE_QUANTITY:
+                raise ValueError(f"delta must be an integer between -{MAX_LINE_QUANTITY} and {MAX_LINE_QUANTITY}")
+            deltas[product_id] = deltas.get(product_id, 0) + line['delta']
+        else:
+            if not _is_int(line['quantity']) or not 0 <= line['quantity'] <= MAX_LINE_QUANTITY:
+                raise ValueError(f"quantity must be an integer between 0 and {MAX_LINE_QUANTITY}")
+            quantities[product_id] = line['quantity']
+    if deltas.keys() & quantities.keys():
+        raise ValueError("a product can't have both a delta and a quantity in one batch")
+    return deltas, quantities
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
@@ -0,0 +1,156 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat
+
+from .models import Category, Product, SearchTrigram
+from .search import bulk_index
+
+# =====================
+# 📦 Catalog Import / Export
+# =====================
+# Products travel as flat rows keyed by SKU, one per CSV line or JSONL record,
+# with the category given by name. Both directions stream: rows are read and
+# written one at a time and the database is hit once per batch, so memory use
+# does not grow with the size of the file.
+
+PRODUCT_FIELDS = ['sku', 'name', 'category', 'price', 'on_sale', 'sale_price', 'description', 'image']
+CATEGORY_FIELDS = ['name']
+FORMATS = ('csv', 'jsonl')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+class CatalogRowError(ValueError):
+    pass
+
+
+def detect_format(path, default='csv'):
+    for fmt in FORMATS:
+        if str(path).endswith('.' + fmt):
+            return fmt
+    return default
+
+
+def read_rows(stream, fmt):
+    """Yield one dict per CSV line / JSONL record."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+class RowWriter:
+    def __init__(self, stream, fmt, fields):
+        self.stream = stream
+        self.fields = fields
+        self.csv = csv.DictWriter(stream, fieldnames=fields) if fmt == 'csv' else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, values):
+        row = dict(zip(self.fields, values))
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, default=str) + '\n')
+
+
+def _decimal(value, field):
+    if value in (None, ''):
+        return Decimal(0)
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise CatalogRowError(f"{field} {value!r} is not a number")
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+def parse_product(row):
+    """Normalize an import row into Product field values (``category`` stays a name)."""
+    sku = str(row.get('sku') or '').strip()
+    name = str(row.get('name') or '').strip()
+    category = str(row.get('category') or '').strip()
+    if not sku or not name or not category:
+        raise CatalogRowError("sku, name and category are required")
+    on_sale = _bool(row.get('on_sale'))
+    price = _decimal(row.get('price'), 'price')
+    sale_price = _decimal(row.get('sale_price'), 'sale_price')
+    return {
+        'sku': sku,
+        'name': name,
+        'category': category,
+        'price': price,
+        'on_sale': on_sale,
+        'sale_price': sale_price,
+        'effective_price': sale_price if on_sale else price,  # bulk writes bypass Product.save()
+        'description': row.get('description') or '',
+        'image': row.get('image') or '',
+    }
+
+
+def backfill_skus():
+    """Give products without a SKU the placeholder ``ID-<pk>`` so exports re-import cleanly; returns how many."""
+    return Product.objects.filter(Q(sku__isnull=True) | Q(sku='')).update(
+        sku=Concat(Value('ID-'), Cast('id', CharField())),
+    )
+
+
+class CategoryMap:
+    """Category name → id, loaded once; unknown names are bulk-created per batch."""
+
+    def __init__(self):
+        self.ids = dict(Category.objects.values_list('name', 'id'))
+
+    def resolve(self, names):
+        missing = {name for name in names if name and name not in self.ids}
+        for category in Category.objects.bulk_create([Category(name=name) for name in sorted(missing)]):
+            self.ids[category.name] = category.id
+        return self.ids
+
+
+UPDATE_FIELDS = ['name', 'category_id', 'price', 'on_sale', 'sale_price', 'effective_price', 'description', 'image']
+
+
+def upsert_products(rows, categories, batch_size):
+    """
+    Create or update one batch of parsed product rows by SKU.
+
+    Returns ``(created, updated)`` counts. The search index is rewritten for
+    every product whose name or description changed.
+    """
+    rows = {row['sku']: row for row in rows}  # the last row wins for a repeated SKU
+    category_ids = categories.resolve(row['category'] for row in rows.values())
+    existing = Product.objects.filter(sku__in=rows).only('id', 'sku', *UPDATE_FIELDS).in_bulk(field_name='sku')
+
+    new, changed, reindex = [], [], []
+    for sku, row in rows.items():
+        values = dict(row)
+        values['category_id'] = category_ids[values.pop('category')]
+        product = existing.get(sku)
+        if product is None:
+            new.append(Product(**values))
+            continue
+        if all(getattr(product, field) == values[field] for field in UPDATE_FIELDS):
+            continue
+        if product.name != values['name'] or product.description != values['description']:
+            reindex.append(product)
+        for field in UPDATE_FIELDS:
+            setattr(product, field, values[field])
+        changed.append(product)
+
+    with transaction.atomic():
+        Product.objects.bulk_create(new, batch_size=batch_size)
+        Product.objects.bulk_update(changed, UPDATE_FIELDS, batch_size=batch_size)
+        SearchTrigram.objects.filter(product__in=reindex).delete()
+        bulk_index(new + reindex)
+    return len(new), len(changed)
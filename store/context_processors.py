@@ -1,6 +1,16 @@
-from .models import CartItem
+from .navigation import category_nav
+from .user_state import get_user_state
+
 
 def cart_item_count(request):
-    if request.user.is_authenticated:
-        return {'cart_item_count': CartItem.objects.filter(user=request.user).count()}
-    return {'cart_item_count': 0}
+    # Callables are only evaluated if a template actually renders the badge,
+    # and the underlying state is cached per user and memoized per request.
+    return {
+        'cart_item_count': lambda: get_user_state(request).cart_count,
+        'cart_subtotal': lambda: get_user_state(request).cart_subtotal,
+    }
+
+
+def category_navigation(request):
+    # Cached per catalog version; only evaluated when a template lists the categories
+    return {'all_categories': lambda: category_nav(request)}
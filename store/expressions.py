@@ -0,0 +1,17 @@
+from django.db.models import Case, DecimalField, F, When
+
+# =====================
+# 🧮 Shared SQL expressions
+# =====================
+# ``prefix`` lets the same expression be used from a related model,
+# e.g. effective_price('product__') on a CartItem queryset.
+
+
+def effective_price(prefix=''):
+    """Sale price when the product is on sale, regular price otherwise."""
+    return Case(
+        When(**{f'{prefix}on_sale': True}, then=F(f'{prefix}sale_price')),
+        default=F(f'{prefix}price'),
+        output_field=DecimalField(max_digits=8, decimal_places=2),
+    )
+
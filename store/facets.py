@@ -0,0 +1,182 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .caching import acatalog_version, catalog_version
+
+# =====================
+# 🎛️ Facet Filters
+# =====================
+# Category and search pages can be narrowed by price range, on-sale, minimum
+# rating and (on search) category. Every option shows how many products it
+# would leave. Those counts come from one aggregate query with a filtered
+# COUNT per option, plus one grouped query for the category facet. They are not
+# one COUNT per option. Each facet's counts respect the other facets'
+# selections but not its own, so picking "On sale" still shows what the other
+# price ranges hold. Counts are cached under the catalog version stamp, so
+# only the first visitor after a catalog change pays for the queries.
+
+PRICE_RANGES = {
+    'under-1000': ('Under ₹1,000', None, 1000),
+    '1000-5000': ('₹1,000 – ₹5,000', 1000, 5000),
+    '5000-20000': ('₹5,000 – ₹20,000', 5000, 20000),
+    '20000-50000': ('₹20,000 – ₹50,000', 20000, 50000),
+    'over-50000': ('Over ₹50,000', 50000, None),
+}
+RATING_THRESHOLDS = (4, 3, 2, 1)
+FACET_CACHE_TIMEOUT = 60 * 10
+
+
+def _price_q(key, prefix=''):
+    _, low, high = PRICE_RANGES[key]
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{prefix}effective_price__gte': low})
+    if high is not None:
+        q &= Q(**{f'{prefix}effective_price__lt': high})
+    return q
+
+
+def _count(q):
+    return Count('id', filter=q) if q else Count('id')
+
+
+class FacetFilters:
+    """The facet selections in a query string (``?price=&on_sale=1&rating=&category=``); bad values are ignored."""
+
+    def __init__(self, params, with_category=True):
+        price = params.get('price')
+        rating = params.get('rating')
+        category = params.get('category') if with_category else None
+        self.selected = {
+            'price': price if price in PRICE_RANGES else None,
+            'on_sale': '1' if params.get('on_sale') == '1' else None,
+            'rating': rating if rating in {str(stars) for stars in RATING_THRESHOLDS} else None,
+            'category': category if category and category.isdigit() else None,
+        }
+        self.with_category = with_category
+
+    def __bool__(self):
+        return any(self.selected.values())
+
+    def condition(self, name, value, prefix=''):
+        if name == 'price':
+            return _price_q(value, prefix)
+        if name == 'on_sale':
+            return Q(**{f'{prefix}on_sale': True})
+        if name == 'rating':
+            return Q(**{f'{prefix}rating_avg__gte': int(value)})
+        return Q(**{f'{prefix}category_id': int(value)})
+
+    def q(self, prefix='', exclude=None):
+        """All active selections as one Q, optionally leaving out the ``exclude`` facet."""
+        q = Q()
+        for name, value in self.selected.items():
+            if value and name != exclude:
+                q &= self.condition(name, value, prefix)
+        return q
+
+    @property
+    def params(self):
+        return [(name, value) for name, value in self.selected.items() if value]
+
+    @property
+    def query(self):
+        """The active selections as a query string, for pagination and sort links."""
+        return urlencode(self.params)
+
+    def toggle_query(self, name, value, extra=()):
+        """Query string with ``name=value`` selected, or cleared if it already is."""
+        selected = {**self.selected, name: None if self.selected[name] == value else value}
+        return urlencode([*extra, *((key, val) for key, val in selected.items() if val)])
+
+
+class FacetOption:
+    def __init__(self, value, label, count, selected, query):
+        self.value = value
+        self.label = label
+        self.count = count
+        self.selected = selected
+        self.query = query
+
+
+class Facet:
+    def __init__(self, name, label, options):
+        self.name = name
+        self.label = label
+        self.options = options
+
+
+def _aggregates(filters):
+    # Aliases are prefixed so they can't collide with the Product fields they filter on
+    aggregates = {'count_total': _count(filters.q())}
+    for i, key in enumerate(PRICE_RANGES):
+        aggregates[f'count_price_{i}'] = _count(filters.q(exclude='price') & _price_q(key))
+    aggregates['count_on_sale'] = _count(filters.q(exclude='on_sale') & Q(on_sale=True))
+    for stars in RATING_THRESHOLDS:
+        aggregates[f'count_rating_{stars}'] = _count(filters.q(exclude='rating') & Q(rating_avg__gte=stars))
+    return aggregates
+
+
+def _category_rows(queryset, filters):
+    return (
+        queryset.filter(filters.q(exclude='category'))
+        .values_list('category_id', 'category__name')
+        .annotate(n=Count('id'))
+        .order_by('category__name')
+    )
+
+
+def _cache_key(version, scope, filters):
+    raw = f'{scope}?{filters.query}'
+    return f'store:facets:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def facet_counts(request, scope, queryset, filters):
+    """Facet counts for ``queryset`` (the page's products before facet filtering), cached per catalog version."""
+    key = _cache_key(catalog_version(request), scope, filters)
+    counts = cache.get(key)
+    if counts is None:
+        counts = queryset.aggregate(**_aggregates(filters))
+        if filters.with_category:
+            counts['categories'] = list(_category_rows(queryset, filters))
+        cache.set(key, counts, FACET_CACHE_TIMEOUT)
+    return counts
+
+
+async def afacet_counts(request, scope, queryset, filters):
+    """Async facet_counts()."""
+    key = _cache_key(await acatalog_version(request), scope, filters)
+    counts = await cache.aget(key)
+    if counts is None:
+        counts = await queryset.aaggregate(**_aggregates(filters))
+        if filters.with_category:
+            counts['categories'] = [row async for row in _category_rows(queryset, filters)]
+        await cache.aset(key, counts, FACET_CACHE_TIMEOUT)
+    return counts
+
+
+def build_facets(counts, filters, extra=()):
+    """Facets ready for store/facets.html; ``extra`` is kept in every option link (e.g. the search query)."""
+    def option(name, value, label, count):
+        selected = filters.selected[name] == value
+        return FacetOption(value, label, count, selected, filters.toggle_query(name, value, extra))
+
+    facets = [
+        Facet('price', 'Price', [
+            option('price', key, label, counts[f'count_price_{i}'])
+            for i, (key, (label, _, _)) in enumerate(PRICE_RANGES.items())
+        ]),
+        Facet('on_sale', 'Deals', [option('on_sale', '1', 'On sale', counts['count_on_sale'])]),
+        Facet('rating', 'Customer rating', [
+            option('rating', str(stars), f'{stars}★ & up', counts[f'count_rating_{stars}'])
+            for stars in RATING_THRESHOLDS
+        ]),
+    ]
+    if filters.with_category:
+        facets.append(Facet('category', 'Category', [
+            option('category', str(category_id), name, n) for category_id, name, n in counts['categories']
+        ]))
+    return facets
@@ -0,0 +1,101 @@
+import hashlib
+import io
+import logging
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# 🖼 Product Image Renditions
+# =====================
+# Each product image is resized once to a few fixed widths in WebP and JPEG.
+# Templates then serve the smallest file that fits via srcset instead of
+# shipping the full original to every card. Saving a product never resizes
+# anything: a product whose rendition_source differs from its image is pending,
+# and the `generate_thumbnails --loop` worker builds its renditions (cards use
+# the original until then) and deletes those of images no product uses any more.
+
+RENDITIONS = {'card': 400, 'detail': 800, 'zoom': 1600}
+FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+RENDITION_DIR = 'uploads/product/renditions'
+QUALITY = 82
+
+
+def _rendition_prefix(image_name):
+    # The stem keeps names readable; the hash of the full stored name keeps
+    # a/foo.jpg, b/foo.jpg and foo.png from sharing (and overwriting) files
+    digest = hashlib.md5(image_name.encode()).hexdigest()[:10]
+    return f'{RENDITION_DIR}/{PurePosixPath(image_name).stem}-{digest}-'
+
+
+def rendition_name(image_name, width, ext):
+    return f'{_rendition_prefix(image_name)}{width}.{ext}'
+
+
+def rendition_widths(original_width):
+    """Widths actually produced for an image; never upscale past the original."""
+    return sorted({min(width, original_width) for width in RENDITIONS.values()})
+
+
+def generate_renditions(image_name, storage=default_storage):
+    """
+    Write every rendition of ``image_name`` and return the original ``(width, height)``.
+
+    Returns None if the source image is missing or unreadable.
+    """
+    try:
+        with storage.open(image_name, 'rb') as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            image.load()
+    except (OSError, ValueError) as exc:
+        logger.warning("Cannot generate renditions for %s: %s", image_name, exc)
+        return None
+
+    width, height = image.size
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    for target in rendition_widths(width):
+        resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        for ext, fmt in FORMATS.items():
+            frame = resized.convert('RGB') if fmt == 'JPEG' else resized
+            buffer = io.BytesIO()
+            frame.save(buffer, fmt, quality=QUALITY, optimize=True)
+            name = rendition_name(image_name, target, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+    return width, height
+
+
+def _stored_renditions(storage):
+    try:
+        _, files = storage.listdir(RENDITION_DIR)
+    except FileNotFoundError:
+        return []
+    return [f'{RENDITION_DIR}/{name}' for name in files]
+
+
+def _delete(names, storage):
+    names = list(names)
+    for name in names:
+        storage.delete(name)
+    return len(names)
+
+
+def delete_renditions(image_names, storage=default_storage):
+    """Delete every rendition file of ``image_names``; returns how many files were removed."""
+    prefixes = tuple(_rendition_prefix(name) for name in image_names)
+    if not prefixes:
+        return 0
+    return _delete((name for name in _stored_renditions(storage) if name.startswith(prefixes)), storage)
+
+
+def prune_renditions(image_names, storage=default_storage):
+    """Delete rendition files that belong to none of ``image_names``, e.g. ones named before migration 0018."""
+    prefixes = tuple(_rendition_prefix(name) for name in image_names)
+    return _delete((name for name in _stored_renditions(storage) if not name.startswith(prefixes)), storage)
@@ -0,0 +1,180 @@
+import re
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.backends.django import Template
+
+# =====================
+# ⏱ Request Metrics
+# =====================
+# A RequestMetrics object is bound to the current request through a context
+# variable. The DB execute wrapper and the template/cache hooks below add to it
+# when one is bound and fall straight through otherwise, so the hooks cost next
+# to nothing for requests that are not being measured.
+
+_current = ContextVar('store_request_metrics', default=None)
+_MISSING = object()
+_installed = False
+
+# Collapse "IN (%s, %s, ...)" so lookups that differ only in list length group together
+_PLACEHOLDER_LIST = re.compile(r'\(%s(?:, %s)*\)')
+_PROJECT_DIR = str(settings.BASE_DIR)
+
+
+def normalize_sql(sql):
+    return _PLACEHOLDER_LIST.sub('(...)', ' '.join(sql.split()))
+
+
+def call_site():
+    """The innermost project frame outside this module, as ``path:line in function``."""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(_PROJECT_DIR) and 'site-packages' not in frame.filename \
+                and frame.filename != __file__:
+            return f"{frame.filename[len(_PROJECT_DIR) + 1:]}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+class RequestMetrics:
+    def __init__(self, duplicate_threshold):
+        self.duplicate_threshold = duplicate_threshold
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.query_counts = Counter()
+        self.call_sites = {}
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def record_query(self, sql, elapsed):
+        self.db_count += 1
+        self.db_time += elapsed
+        pattern = normalize_sql(sql)
+        self.query_counts[pattern] += 1
+        # Only pay for a stack walk once a pattern actually repeats
+        if self.query_counts[pattern] == self.duplicate_threshold:
+            self.call_sites[pattern] = call_site()
+
+    def duplicates(self):
+        """``(count, sql, call_site)`` for every query pattern run at least the threshold number of times."""
+        return [
+            (count, pattern, self.call_sites.get(pattern, 'unknown'))
+            for pattern, count in self.query_counts.most_common()
+            if count >= self.duplicate_threshold
+        ]
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'view;dur={self.total_time * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        return {
+            'db_queries': self.db_count,
+            'db_ms': round(self.db_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'view_ms': round(self.total_time * 1000, 1),
+            'duplicate_queries': len(self.duplicates()),
+        }
+
+
+def current_metrics():
+    return _current.get()
+
+
+def bind(metrics):
+    return _current.set(metrics)
+
+
+def unbind(token):
+    _current.reset(token)
+
+
+def db_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+# =====================
+# 🪝 Template & Cache Hooks
+# =====================
+# Django has no production signal for template rendering or cache lookups, so
+# the render/get methods are wrapped once when instrumentation is enabled.
+# Nested renders (includes, product_card fragments) are only timed at the
+# outermost level to avoid double counting.
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None:
+            return get(self, key, default, version)
+        value = get(self, key, _MISSING, version)
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        values = get_many(self, keys, version)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += len(values)
+            metrics.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+def install_hooks():
+    """Wrap template rendering and the configured cache backends (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    Template.render = _timed_render(Template.render)
+    for backend in {type(caches[alias]) for alias in settings.CACHES}:
+        backend.get = _counted_get(backend.get)
+        # BaseCache.get_many already goes through get(); only wrap native implementations
+        if 'get_many' in vars(backend):
+            backend.get_many = _counted_get_many(backend.get_many)
+    _installed = True
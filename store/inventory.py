@@ -0,0 +1,246 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Inventory, StockReservation
+
+# =====================
+# 📦 Stock & Reservations
+# =====================
+# Stock is only ever changed by conditional UPDATEs of the form
+# ``... WHERE on_hand - reserved >= qty``. Every cart line goes through one
+# statement, and a checkout that updates fewer rows than it has tracked lines
+# rolls back, so stock can't be oversold however many checkouts race for the
+# last unit. Only the inventory rows of the products being bought are written.
+# Product rows, and every other product, are untouched.
+#
+# Opening the checkout page holds the cart's units for STORE_RESERVATION_TTL
+# (StockReservation rows + Inventory.reserved). Placing the order converts the
+# hold into a sale. Abandoned holds are released by `manage.py
+# release_reservations`. Listing pages read a cached set of sold-out product
+# ids, which is dropped whenever a product sells out or comes back into stock.
+
+OUT_OF_STOCK_KEY = 'store:out_of_stock'
+OUT_OF_STOCK_TIMEOUT = 60 * 5
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Not enough stock for product(s) {', '.join(map(str, self.product_ids))}")
+
+
+def _sold_out_rows():
+    # Matches the inventory_sold_out_idx partial index
+    return Inventory.objects.filter(on_hand__lte=F('reserved')).values_list('product_id', flat=True)
+
+
+def out_of_stock_ids(request=None):
+    """Ids of tracked products with nothing available (memoized on ``request``)."""
+    ids = getattr(request, '_store_out_of_stock', None)
+    if ids is None:
+        ids = cache.get(OUT_OF_STOCK_KEY)
+        if ids is None:
+            ids = frozenset(_sold_out_rows())
+            cache.set(OUT_OF_STOCK_KEY, ids, OUT_OF_STOCK_TIMEOUT)
+        if request is not None:
+            request._store_out_of_stock = ids
+    return ids
+
+
+async def aout_of_stock_ids(request=None):
+    """Async out_of_stock_ids()."""
+    ids = getattr(request, '_store_out_of_stock', None)
+    if ids is None:
+        ids = await cache.aget(OUT_OF_STOCK_KEY)
+        if ids is None:
+            ids = frozenset([pk async for pk in _sold_out_rows()])
+            await cache.aset(OUT_OF_STOCK_KEY, ids, OUT_OF_STOCK_TIMEOUT)
+        if request is not None:
+            request._store_out_of_stock = ids
+    return ids
+
+
+def invalidate_out_of_stock():
+    transaction.on_commit(lambda: cache.delete(OUT_OF_STOCK_KEY))
+
+
+def _invalidate_if_sold_out_changed(available_deltas):
+    """Drop the sold-out set only if a product just crossed between in stock and sold out.
+
+    Reads the rows after this transaction's UPDATE, so they are locked and exact;
+    ``available_deltas`` is ``{product_id: change in on_hand - reserved}``.
+    """
+    rows = Inventory.objects.filter(product_id__in=available_deltas).values_list('product_id', 'on_hand', 'reserved')
+    for product_id, on_hand, reserved in rows:
+        available = on_hand - reserved
+        if (available <= 0) != (available - available_deltas[product_id] <= 0):
+            invalidate_out_of_stock()
+            return
+
+
+def _per_product(values):
+    """CASE product_id WHEN ... THEN n expression for a {product_id: n} mapping."""
+    return Case(
+        *(When(product_id=product_id, then=Value(n)) for product_id, n in values.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _covers(amount, release, wanted):
+    """Rows that can supply ``amount`` once the user's own hold is released (pure releases always can)."""
+    return Q(on_hand__gte=F('reserved') - release + amount) | ~Q(product_id__in=list(wanted))
+
+
+def _held(user_id):
+    """The user's current holds as {product_id: quantity}, locked until the transaction ends."""
+    return dict(
+        StockReservation.objects.select_for_update()
+        .filter(user_id=user_id)
+        .values_list('product_id', 'quantity')
+    )
+
+
+def _tracked(product_ids):
+    return set(Inventory.objects.filter(product_id__in=product_ids).values_list('product_id', flat=True))
+
+
+def _split(quantities, held):
+    """The tracked part of the request and of the user's hold, as (wanted, releasing)."""
+    # A hold on a product that is no longer tracked has no Inventory row to give its units back to
+    tracked = _tracked(quantities.keys() | held.keys())
+    wanted = {product_id: quantities[product_id] for product_id in tracked & quantities.keys()}
+    releasing = {product_id: held[product_id] for product_id in tracked & held.keys()}
+    return wanted, releasing
+
+
+def _shortfall(quantities, held):
+    """Tracked products among ``quantities`` that can't cover the requested amount."""
+    rows = Inventory.objects.filter(product_id__in=quantities).values_list('product_id', 'on_hand', 'reserved')
+    return {
+        product_id for product_id, on_hand, reserved in rows
+        if on_hand - reserved + held.get(product_id, 0) < quantities[product_id]
+    }
+
+
+def reserve_stock(user_id, quantities):
+    """
+    Hold ``{product_id: qty}`` for the user's checkout, replacing any previous hold.
+
+    All or nothing: returns the ids that couldn't be held (then nothing changes).
+    """
+    # Untracked carts (the common case) never open a write transaction
+    if not _tracked(quantities) and not StockReservation.objects.filter(user_id=user_id).exists():
+        return set()
+    with transaction.atomic():
+        held = _held(user_id)
+        wanted, releasing = _split(quantities, held)
+        if not wanted and not held:
+            return set()
+        expires_at = timezone.now() + timedelta(seconds=settings.STORE_RESERVATION_TTL)
+        if wanted == held:
+            # Reopening the checkout page with the same cart only extends the hold
+            StockReservation.objects.filter(user_id=user_id).update(expires_at=expires_at)
+            return set()
+        products = wanted.keys() | releasing.keys()
+        need = _per_product(wanted)
+        release = _per_product(releasing)
+        updated = Inventory.objects.filter(_covers(need, release, wanted), product_id__in=products).update(
+            reserved=F('reserved') - release + need,
+        )
+        if updated == len(products):
+            StockReservation.objects.filter(user_id=user_id).delete()
+            StockReservation.objects.bulk_create(
+                StockReservation(user_id=user_id, product_id=product_id, quantity=qty, expires_at=expires_at)
+                for product_id, qty in wanted.items()
+            )
+            _invalidate_if_sold_out_changed({
+                product_id: releasing.get(product_id, 0) - wanted.get(product_id, 0) for product_id in products
+            })
+            return set()
+        transaction.set_rollback(True)
+    return _shortfall(quantities, held) or set(wanted)
+
+
+def commit_stock(user_id, quantities):
+    """
+    Take ``{product_id: qty}`` out of stock for a placed order, consuming the user's hold.
+
+    Must run inside the order's transaction; raises OutOfStock (nothing is taken) when a
+    tracked line can't be covered.
+    """
+    held = _held(user_id)
+    if held:
+        StockReservation.objects.filter(user_id=user_id).delete()
+    sold, releasing = _split(quantities, held)
+    if not sold and not releasing:
+        return
+    products = sold.keys() | releasing.keys()
+    take = _per_product(sold)
+    release = _per_product(releasing)
+    updated = Inventory.objects.filter(_covers(take, release, sold), product_id__in=products).update(
+        on_hand=F('on_hand') - take, reserved=F('reserved') - release,
+    )
+    if updated != len(products):
+        raise OutOfStock(_shortfall(quantities, held) or sold.keys())
+    _invalidate_if_sold_out_changed({
+        product_id: releasing.get(product_id, 0) - sold.get(product_id, 0) for product_id in products
+    })
+
+
+def _release(holds):
+    """Give the units of ``[(id, product_id, quantity), ...]`` holds back to stock and delete them."""
+    released = {}
+    for _, product_id, quantity in holds:
+        released[product_id] = released.get(product_id, 0) + quantity
+    Inventory.objects.filter(product_id__in=released).update(
+        reserved=Case(
+            *(When(product_id=product_id, reserved__gte=n, then=F('reserved') - n) for product_id, n in released.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    StockReservation.objects.filter(id__in=[pk for pk, _, _ in holds]).delete()
+    _invalidate_if_sold_out_changed(released)
+
+
+def release_expired(batch_size=500, now=None):
+    """Release up to ``batch_size`` expired holds; returns how many were released."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = list(
+            StockReservation.objects.select_for_update(skip_locked=True)
+            .filter(expires_at__lte=now)
+            .values_list('id', 'product_id', 'quantity')[:batch_size]
+        )
+        if expired:
+            _release(expired)
+    return len(expired)
+
+
+def release_holds(reservations):
+    """Release a queryset of holds before they expire (e.g. deleted in the admin); returns how many."""
+    with transaction.atomic():
+        holds = list(reservations.select_for_update().values_list('id', 'product_id', 'quantity'))
+        if holds:
+            _release(holds)
+    return len(holds)
+
+
+def recount_reserved():
+    """Recompute every Inventory.reserved from the live holds (repairs drift, e.g. after a restored backup)."""
+    holds = (
+        StockReservation.objects.filter(product_id=OuterRef('product_id'))
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    updated = Inventory.objects.update(reserved=Coalesce(Subquery(holds), 0))
+    invalidate_out_of_stock()
+    return updated
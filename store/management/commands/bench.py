@@ -0,0 +1,257 @@
+import json
+import math
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from store.models import Category, Product
+
+# route name → (relative weight, needs a logged-in user)
+DEFAULT_MIX = {
+    'home': (30, False),
+    'product': (25, False),
+    'product_page': (10, False),
+    'category_products': (10, False),
+    'categories': (5, False),
+    'search_results': (10, False),
+    'about': (2, False),
+    'cart': (4, True),
+    'checkout': (2, True),
+    'wishlist_view': (2, True),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of store routes against the WSGI app (in-process or a local gunicorn) "
+        "and report throughput and p50/p95/p99 latency per route as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=50, help="Unmeasured requests sent first.")
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--mix', default='', help="Override weights, e.g. 'home=50,product=50'.")
+        parser.add_argument('--user', help="Username for logged-in routes (default: the newest user with a cart).")
+        parser.add_argument('--gunicorn', action='store_true', help="Benchmark a local gunicorn instead of in-process.")
+        parser.add_argument('--asgi', action='store_true',
+                            help="With --gunicorn, serve ecommerce.asgi (async views) on uvicorn workers.")
+        parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes.")
+        parser.add_argument('--port', type=int, default=0, help="gunicorn port (default: a free one).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.product_ids = list(Product.objects.values_list('id', flat=True)[:1000])
+        self.category_ids = list(Category.objects.values_list('id', flat=True))
+        if not self.product_ids or not self.category_ids:
+            raise CommandError("The catalog is empty; run `manage.py seed_catalog` first.")
+        self.search_terms = sorted({
+            word.lower() for name in Product.objects.values_list('name', flat=True)[:200]
+            for word in name.split() if word.isalpha()
+        }) or ['a']
+
+        mix = self.parse_mix(options['mix'])
+        self.session_cookie = self.login(options['user']) if any(auth for _, auth in mix.values()) else None
+        routes, weights = list(mix), [weight for weight, _ in mix.values()]
+        plan = self.rng.choices(routes, weights=weights, k=options['warmup'] + options['requests'])
+        plan = [(name, self.url_for(name), mix[name][1]) for name in plan]
+        warmup, measured = plan[:options['warmup']], plan[options['warmup']:]
+
+        if options['gunicorn']:
+            with self.gunicorn(options['workers'], options['port'], options['asgi']) as base_url:
+                send = self.http_sender(base_url)
+                report = self.run(send, warmup, measured, options['concurrency'])
+            report['mode'] = f"gunicorn {'asgi' if options['asgi'] else 'wsgi'} ({options['workers']} workers)"
+        else:
+            report = self.run(self.inprocess_sender(), warmup, measured, options['concurrency'])
+            report['mode'] = 'in-process'
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def parse_mix(self, spec):
+        if not spec:
+            return DEFAULT_MIX
+        mix = {}
+        for item in spec.split(','):
+            name, _, weight = item.partition('=')
+            name = name.strip()
+            if name not in DEFAULT_MIX:
+                raise CommandError(f"Unknown route {name!r}; choose from {', '.join(DEFAULT_MIX)}.")
+            mix[name] = (float(weight or 1), DEFAULT_MIX[name][1])
+        return mix
+
+    def login(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(cartitem__isnull=False).order_by('-id').first()
+        if user is None:
+            raise CommandError("No user to run logged-in routes as; pass --user or seed some carts.")
+        client = Client()
+        client.force_login(user)
+        return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def url_for(self, name):
+        if name == 'product':
+            return reverse(name, args=[self.rng.choice(self.product_ids)])
+        if name == 'category_products':
+            return reverse(name, args=[self.rng.choice(self.category_ids)])
+        if name == 'search_results':
+            return f"{reverse(name)}?q={self.rng.choice(self.search_terms)}"
+        return reverse(name)
+
+    # =====================
+    # 📨 Request senders
+    # =====================
+    # Each sender takes (url, authenticated) and returns the HTTP status code.
+
+    def inprocess_sender(self):
+        local = threading.local()
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '')), 'localhost')
+
+        def send(url, authenticated):
+            if not hasattr(local, 'clients'):
+                local.clients = {False: Client(HTTP_HOST=host), True: Client(HTTP_HOST=host)}
+                local.clients[True].cookies[settings.SESSION_COOKIE_NAME] = self.session_cookie or ''
+            return local.clients[authenticated].get(url).status_code
+        return send
+
+    def http_sender(self, base_url):
+        def send(url, authenticated):
+            request = urllib.request.Request(base_url + url)
+            if authenticated:
+                request.add_header('Cookie', f'{settings.SESSION_COOKIE_NAME}={self.session_cookie}')
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as exc:
+                return exc.code
+        return send
+
+    @contextmanager
+    def gunicorn(self, workers, port, asgi=False):
+        """Start gunicorn on the project's WSGI (or ASGI) app and yield its base URL."""
+        if shutil.which('gunicorn') is None:
+            raise CommandError("gunicorn is not installed.")
+        port = port or _free_port()
+        app = ['ecommerce.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'] if asgi \
+            else ['ecommerce.wsgi:application']
+        process = subprocess.Popen(
+            ['gunicorn', *app, '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, stdout=sys.stderr,
+        )
+        try:
+            _wait_for_port(port, process)
+            self.stderr.write(f"gunicorn listening on 127.0.0.1:{port}")
+            yield f'http://127.0.0.1:{port}'
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    # =====================
+    # 📈 Measurement
+    # =====================
+
+    def run(self, send, warmup, measured, concurrency):
+        def timed(step):
+            name, url, authenticated = step
+            start = time.perf_counter()
+            status = send(url, authenticated)
+            return name, time.perf_counter() - start, status
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, warmup))
+            started = time.perf_counter()
+            results = list(pool.map(timed, measured))
+            elapsed = time.perf_counter() - started
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        for name, latency, status in results:
+            latencies[name].append(latency * 1000)
+            if status >= 400:
+                errors[name] += 1
+
+        routes = {}
+        for name in sorted(latencies):
+            values = sorted(latencies[name])
+            routes[name] = {
+                'requests': len(values),
+                'errors': errors[name],
+                'mean_ms': round(sum(values) / len(values), 2),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+            }
+        all_values = sorted(value for values in latencies.values() for value in values)
+        return {
+            'revision': git_revision(),
+            'requests': len(results),
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 3),
+            'throughput_rps': round(len(results) / elapsed, 1) if elapsed else None,
+            'errors': sum(errors.values()),
+            'p50_ms': round(percentile(all_values, 50), 2),
+            'p95_ms': round(percentile(all_values, 95), 2),
+            'p99_ms': round(percentile(all_values, 99), 2),
+            'routes': routes,
+        }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"gunicorn exited with status {process.returncode}.")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError("gunicorn did not start listening in time.")
@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client
+from django.urls import reverse
+
+from store.models import CartItem, Category, Inventory, OrderItem, Product
+
+from .bench import git_revision, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Contention benchmark: many buyers check out the same low-stock product at once while readers "
+        "keep browsing. Reports sales vs stock (oversold must be 0) and checkout/reader latency as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=40)
+        parser.add_argument('--stock', type=int, default=10, help="Units of the hot product on hand.")
+        parser.add_argument('--quantity', type=int, default=1, help="Units in each buyer's cart.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Checkouts in flight at once.")
+        parser.add_argument('--readers', type=int, default=4, help="Threads browsing while buyers check out.")
+        parser.add_argument('--reader-requests', type=int, default=200,
+                            help="Reader requests measured before the rush, as the idle baseline.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark product, users and orders.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        category = Category.objects.order_by('id').first()
+        self.browse_ids = list(Product.objects.values_list('id', flat=True)[:200])
+        if category is None or not self.browse_ids:
+            raise CommandError("The catalog is empty; run `manage.py seed_catalog` first.")
+        self.host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '')), 'localhost')
+
+        token = uuid.uuid4().hex[:8]
+        hot = Product.objects.create(name=f'Bench hot item {token}', sku=f'BENCH-{token}', price=100, category=category)
+        Inventory.objects.create(product=hot, on_hand=options['stock'])
+        users = User.objects.bulk_create([
+            User(username=f'bench-{token}-{i}', password='!') for i in range(options['buyers'] + 1)
+        ])
+        reader, buyers = users[0], users[1:]
+        CartItem.objects.bulk_create([CartItem(user=user, product=hot, quantity=options['quantity']) for user in buyers])
+        try:
+            report = self.run(hot, reader, buyers, options)
+        finally:
+            if not options['keep']:
+                User.objects.filter(id__in=[user.id for user in users]).delete()
+                hot.delete()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def client(self, user):
+        client = Client(HTTP_HOST=self.host)
+        client.force_login(user)
+        return client
+
+    def run(self, hot, reader, buyers, options):
+        buyer_clients = [self.client(user) for user in buyers]
+        reader_cookie = self.client(reader).cookies[settings.SESSION_COOKIE_NAME].value
+        reader_urls = [reverse('product', args=[hot.id]), reverse('home')]
+        reader_urls += [reverse('product', args=[pk]) for pk in self.browse_ids]
+
+        def browse(count=None, until=None):
+            # Logged-in, so every page bypasses the anonymous page cache and reads the database
+            client = Client(HTTP_HOST=self.host)
+            client.cookies[settings.SESSION_COOKIE_NAME] = reader_cookie
+            latencies, i = [], 0
+            while (count is None or i < count) and (until is None or not until.is_set()):
+                start = time.perf_counter()
+                client.get(reader_urls[i % len(reader_urls)])
+                latencies.append((time.perf_counter() - start) * 1000)
+                i += 1
+            connection.close()
+            return latencies
+
+        def checkout(client):
+            client.get(reverse('checkout'))  # reserves the cart's stock, like a real visit to the form
+            start = time.perf_counter()
+            client.post(reverse('checkout'), {
+                'name': 'Bench', 'address': '1 Bench Street', 'phone': '0000000000',
+                'payment_mode': 'cod', 'idempotency_key': uuid.uuid4().hex,
+            })
+            elapsed = (time.perf_counter() - start) * 1000
+            connection.close()
+            return elapsed
+
+        idle = browse(count=options['reader_requests'])
+
+        done = threading.Event()
+        with ThreadPoolExecutor(max_workers=options['readers']) as reader_pool:
+            readers = [reader_pool.submit(browse, until=done) for _ in range(options['readers'])]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                checkout_ms = list(pool.map(checkout, buyer_clients))
+            elapsed = time.perf_counter() - started
+            done.set()
+            busy = [latency for future in readers for latency in future.result()]
+
+        inventory = Inventory.objects.get(product=hot)
+        sales = OrderItem.objects.filter(product=hot)
+        sold = sales.aggregate(units=Sum('quantity'))['units'] or 0
+        orders = sales.values('order').distinct().count()
+        return {
+            'revision': git_revision(),
+            'database': connection.vendor,
+            'buyers': len(buyers),
+            'stock': options['stock'],
+            'quantity': options['quantity'],
+            'concurrency': options['concurrency'],
+            'orders': orders,
+            'rejected': len(buyers) - orders,
+            'units_sold': sold,
+            'oversold': max(sold - options['stock'], 0),
+            'on_hand_after': inventory.on_hand,
+            'reserved_after': inventory.reserved,
+            'consistent': inventory.on_hand + sold == options['stock'],
+            'checkout_duration_s': round(elapsed, 3),
+            'checkout': _latency(checkout_ms),
+            'readers_idle': _latency(idle),
+            'readers_during_checkout': _latency(busy),
+        }
+
+
+def _latency(values):
+    values = sorted(values)
+    return {
+        'requests': len(values),
+        'p50_ms': round(percentile(values, 50), 2) if values else None,
+        'p95_ms': round(percentile(values, 95), 2) if values else None,
+    }
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from store.caching import bump_catalog_version
+from store.catalog_io import CATEGORY_FIELDS, FORMATS, PRODUCT_FIELDS, RowWriter, backfill_skus, detect_format
+from store.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream products (or categories) to CSV or JSONL in constant memory. Products without a SKU are "
+        "first given ID-<pk> so the file can be read back with import_catalog (--categories for categories)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or '-' for stdout (default).")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension, else csv.")
+        parser.add_argument('--categories', action='store_true', help="Export category names instead of products.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        if options['categories']:
+            fields = CATEGORY_FIELDS
+            rows = Category.objects.order_by('id').values_list('name')
+        else:
+            if backfilled := backfill_skus():
+                bump_catalog_version()
+                self.stderr.write(f"Gave {backfilled} product(s) without a SKU an ID-<pk> SKU.")
+            fields = PRODUCT_FIELDS
+            rows = Product.objects.order_by('id').values_list(
+                'sku', 'name', 'category__name', 'price', 'on_sale', 'sale_price', 'description', 'image',
+            )
+
+        stream = sys.stdout if options['path'] == '-' else open(options['path'], 'w', newline='', encoding='utf-8')
+        count = 0
+        try:
+            writer = RowWriter(stream, fmt, fields)
+            for row in rows.iterator(chunk_size=options['chunk_size']):
+                writer.write(row)
+                count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} row(s)."))
@@ -0,0 +1,89 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from store.caching import bump_catalog_version
+from store.images import delete_renditions, generate_renditions, prune_renditions
+from store.models import Product
+
+
+def _render(image_name):
+    return image_name, generate_renditions(image_name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate (or backfill) resized WebP/JPEG renditions for product images using a process pool, "
+        "and delete the renditions of images no product uses any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help="Regenerate renditions that are already up to date.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new or changed product images.")
+        parser.add_argument('--interval', type=float, default=10.0, help="Seconds to sleep between polls when idle.")
+        parser.add_argument('--prune', action='store_true',
+                            help="First delete every rendition file that belongs to no current product image.")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            images = Product.objects.exclude(image='').values_list('image', flat=True).distinct()
+            self.stdout.write(f"Pruned {prune_renditions(images)} orphaned rendition file(s).")
+
+        force = options['force']
+        total_done = total_failed = 0
+        while True:
+            done, failed = self.generate(options['workers'], force)
+            force = False
+            total_done += done
+            total_failed += failed
+            if done:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        if not total_done and not total_failed:
+            self.stdout.write("All renditions are up to date.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated renditions for {total_done} image(s), {total_failed} failed."
+        ))
+
+    def generate(self, workers, force):
+        """One pass over the pending products; returns ``(done, failed)`` image counts."""
+        products = Product.objects.exclude(image='')
+        if not force:
+            products = products.exclude(rendition_source=F('image'))
+        image_names = set(products.values_list('image', flat=True))
+        replaced = set(
+            Product.objects.exclude(rendition_source='').exclude(rendition_source=F('image'))
+            .values_list('rendition_source', flat=True)
+        )
+
+        done = failed = 0
+        if image_names:
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                for image_name, size in pool.map(_render, sorted(image_names), chunksize=8):
+                    if size is None:
+                        failed += 1
+                        continue
+                    width, height = size
+                    Product.objects.filter(image=image_name).update(
+                        image_width=width, image_height=height, rendition_source=image_name
+                    )
+                    done += 1
+        if done:
+            # The QuerySet.update() bypasses the signals, so cached cards/pages are invalidated here
+            bump_catalog_version()
+
+        if replaced:
+            Product.objects.filter(image='', rendition_source__in=replaced).update(rendition_source='')
+            orphaned = replaced - set(Product.objects.filter(image__in=replaced).values_list('image', flat=True))
+            if deleted := delete_renditions(orphaned):
+                self.stdout.write(f"Deleted {deleted} rendition file(s) of replaced images.")
+        return done, failed
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from store.caching import bump_catalog_version
+from store.catalog_io import (
+    FORMATS, CatalogRowError, CategoryMap, detect_format, parse_product, read_rows, upsert_products,
+)
+
+
+def _copy_image(source_dir, name):
+    """Copy ``name`` from ``source_dir`` into media storage unless it is already there."""
+    if default_storage.exists(name):
+        return True
+    path = os.path.join(source_dir, os.path.basename(name))
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        default_storage.save(name, File(f))
+    return True
+
+
+class Command(BaseCommand):
+    help = "Stream products from CSV or JSONL and upsert them by SKU in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension, else csv.")
+        parser.add_argument('--categories', action='store_true',
+                            help="Read category names (as written by export_catalog --categories) instead of products.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--images-from', metavar='DIR',
+                            help="Copy each row's image (matched by file name) from DIR into media storage.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Parallel image copies / rendition workers when --images-from is given.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        categories = CategoryMap()
+        created = updated = self.skipped = 0
+        images = set()
+        started = time.perf_counter()
+
+        try:
+            if options['categories']:
+                created = self.import_categories(read_rows(stream, fmt), categories, options['batch_size'])
+            else:
+                rows = self.parse(read_rows(stream, fmt))
+                while batch := list(islice(rows, options['batch_size'])):
+                    images.update(row['image'] for row in batch if row['image'])
+                    batch_created, batch_updated = upsert_products(batch, categories, options['batch_size'])
+                    created += batch_created
+                    updated += batch_updated
+                    self.stdout.write(f"… {created} created, {updated} updated")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        bump_catalog_version()
+
+        if options['images_from'] and images:
+            self.ingest_images(options['images_from'], images, options['workers'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported in {time.perf_counter() - started:.1f}s: {created} created, {updated} updated, "
+            f"{self.skipped} skipped."
+        ))
+
+    def import_categories(self, rows, categories, batch_size):
+        """Create the categories whose names are missing; returns how many were created."""
+        known = len(categories.ids)
+        names = (str(row.get('name') or '').strip() for row in rows)
+        while batch := list(islice(names, batch_size)):
+            categories.resolve(batch)
+        return len(categories.ids) - known
+
+    def parse(self, rows):
+        self.skipped = 0
+        for line, row in enumerate(rows, start=1):
+            try:
+                yield parse_product(row)
+            except CatalogRowError as exc:
+                self.skipped += 1
+                self.stderr.write(f"Row {line}: {exc}; skipped.")
+
+    def ingest_images(self, source_dir, images, workers):
+        if not os.path.isdir(source_dir):
+            raise CommandError(f"{source_dir} is not a directory.")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            found = sum(pool.map(lambda name: _copy_image(source_dir, name), sorted(images)))
+        self.stdout.write(f"Copied {found} of {len(images)} image(s).")
+        call_command('generate_thumbnails', workers=workers, stdout=self.stdout)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from store.caching import bump_catalog_version
+from store.models import Product, Review
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized rating aggregates on every Product from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        counts = {}
+        rows = Review.objects.values_list('product_id', 'rating').annotate(n=Count('id')).order_by()
+        for product_id, rating, n in rows.iterator():
+            counts.setdefault(product_id, {})[rating] = n
+
+        updated = []
+        with transaction.atomic():
+            for product in Product.objects.only('pk', *Product.RATING_FIELDS).iterator():
+                stats = Product.rating_stats_from_counts(counts.get(product.pk, {}))
+                if all(getattr(product, field) == value for field, value in stats.items()):
+                    continue
+                for field, value in stats.items():
+                    setattr(product, field, value)
+                updated.append(product)
+            Product.objects.bulk_update(updated, Product.RATING_FIELDS, batch_size=options['batch_size'])
+            if updated:
+                # bulk_update() bypasses the signals, so cached cards/pages are invalidated here
+                bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating stats for {len(updated)} product(s)."))
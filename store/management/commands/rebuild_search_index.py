@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Product, SearchTrigram
+from store.search import index_rows
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search trigram index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        indexed = 0
+        rows = []
+        with transaction.atomic():
+            SearchTrigram.objects.all().delete()
+            for product in Product.objects.only('id', 'name', 'description').iterator(chunk_size=batch_size):
+                rows.extend(index_rows(product))
+                indexed += 1
+                if len(rows) >= batch_size:
+                    SearchTrigram.objects.bulk_create(rows, batch_size=batch_size)
+                    rows = []
+            SearchTrigram.objects.bulk_create(rows, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} product(s)."))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.inventory import recount_reserved, release_expired
+
+
+class Command(BaseCommand):
+    help = "Return the stock held by abandoned checkouts once their reservations expire."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting once nothing has expired.")
+        parser.add_argument('--interval', type=float, default=30.0, help="Seconds to sleep between polls when idle.")
+        parser.add_argument('--recount', action='store_true', help="First recompute every reserved count from the live holds.")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f"Recounted reserved stock for {recount_reserved()} product(s).")
+
+        total = 0
+        while True:
+            released = release_expired(options['batch_size'])
+            total += released
+            if released:
+                self.stdout.write(f"Released {released} reservation(s).")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Released {total} expired reservation(s)."))
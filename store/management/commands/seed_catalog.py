@@ -0,0 +1,181 @@
+import io
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+
+from store.caching import bump_catalog_version
+from store.images import generate_renditions
+from store.models import CartItem, Category, OrderGroup, OrderItem, Product, Review, SearchTrigram, Wishlist
+from store.search import index_rows
+
+ADJECTIVES = ['Classic', 'Smart', 'Ultra', 'Compact', 'Pro', 'Wireless', 'Eco', 'Deluxe', 'Portable', 'Premium']
+NOUNS = ['Phone', 'Laptop', 'Headphones', 'Watch', 'Camera', 'Speaker', 'Guitar', 'Backpack', 'Lamp', 'Kettle']
+COLOURS = ['#e63946', '#f1a208', '#2a9d8f', '#264653', '#8338ec', '#3a86ff', '#fb5607', '#6a994e']
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate a synthetic catalog, users, reviews, carts, wishlists and orders for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--reviews', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--cart-items', type=int, default=3, help="Cart lines per user.")
+        parser.add_argument('--wishlist-items', type=int, default=3, help="Wishlist entries per user.")
+        parser.add_argument('--images', type=int, default=len(COLOURS), help="Distinct placeholder images to share.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for reproducible data sets.")
+        parser.add_argument('--password', default='bench', help="Password given to every generated user.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Usernames must be unique, so each run gets its own suffix
+        prefix = f"s{options['seed']}"
+        run = f"{prefix}-{User.objects.filter(username__startswith=prefix + '-').count()}"
+
+        images = self.placeholder_images(options['images'])
+        with transaction.atomic():
+            categories = self.create_categories(run, options['categories'])
+            products = self.create_products(run, categories, images, options['products'])
+            users = self.create_users(run, options['users'], options['password'])
+            self.create_reviews(products, users, options['reviews'])
+            self.create_baskets(products, users, options['cart_items'], options['wishlist_items'])
+            self.create_orders(products, users, options['orders'])
+            # bulk_create skips Product.save() and the signals, so derived data is built here
+            self.index_products(products)
+            call_command('rebuild_rating_stats', batch_size=self.batch_size, stdout=self.stdout)
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded run {run}: {len(categories)} categories, {len(products)} products, {len(users)} users "
+            f"(password {options['password']!r})."
+        ))
+
+    def placeholder_images(self, count):
+        """Create (once) ``count`` solid-colour product images with renditions; return ``(name, width, height)``."""
+        images = []
+        for i in range(max(1, count)):
+            name = f'uploads/product/seed-{i}.png'
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                Image.new('RGB', (1200, 900), COLOURS[i % len(COLOURS)]).save(buffer, 'PNG')
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            width, height = generate_renditions(name) or (None, None)
+            images.append((name, width, height))
+        return images
+
+    def create_categories(self, run, count):
+        return Category.objects.bulk_create(
+            [Category(name=f'{self.rng.choice(NOUNS)}s {run}-{i}') for i in range(count)],
+            batch_size=self.batch_size,
+        )
+
+    def create_products(self, run, categories, images, count):
+        products = []
+        for i in range(count):
+            price = Decimal(self.rng.randrange(199, 99999)) / 100
+            on_sale = self.rng.random() < 0.2
+            sale_price = (price * Decimal('0.8')).quantize(Decimal('0.01')) if on_sale else Decimal(0)
+            name, width, height = self.rng.choice(images)
+            products.append(Product(
+                name=f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)} {run}-{i}',
+                description=f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS).lower()} for everyday use.',
+                category=self.rng.choice(categories),
+                price=price,
+                on_sale=on_sale,
+                sale_price=sale_price,
+                effective_price=sale_price if on_sale else price,
+                image=name,
+                image_width=width,
+                image_height=height,
+                rendition_source=name if width else '',
+            ))
+        return Product.objects.bulk_create(products, batch_size=self.batch_size)
+
+    def create_users(self, run, count, password):
+        password = make_password(password)  # hash once; hashing per user would dominate the run
+        return User.objects.bulk_create(
+            [User(username=f'{run}-{i}', email=f'{run}-{i}@example.com', password=password) for i in range(count)],
+            batch_size=self.batch_size,
+        )
+
+    def sample_pairs(self, products, users, count):
+        """Up to ``count`` distinct (product, user) pairs."""
+        count = min(count, len(products) * len(users))
+        pairs = set()
+        while len(pairs) < count:
+            pairs.add((self.rng.choice(products), self.rng.choice(users)))
+        return pairs
+
+    def create_reviews(self, products, users, count):
+        if not (products and users):
+            return
+        Review.objects.bulk_create(
+            [
+                Review(product=product, user=user, rating=self.rng.choices(range(1, 6), weights=[1, 1, 3, 5, 4])[0],
+                       comment='Synthetic review.')
+                for product, user in self.sample_pairs(products, users, count)
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_baskets(self, products, users, cart_items, wishlist_items):
+        if not products:
+            return
+        carts, wishlists = [], []
+        for user in users:
+            for product in self.rng.sample(products, min(cart_items, len(products))):
+                carts.append(CartItem(user=user, product=product, quantity=self.rng.randint(1, 3)))
+            for product in self.rng.sample(products, min(wishlist_items, len(products))):
+                wishlists.append(Wishlist(user=user, product=product))
+        CartItem.objects.bulk_create(carts, batch_size=self.batch_size)
+        Wishlist.objects.bulk_create(wishlists, batch_size=self.batch_size)
+
+    def create_orders(self, products, users, count):
+        if not (products and users):
+            return
+        lines = []
+        for _ in range(count):
+            picked = [(product, self.rng.randint(1, 3)) for product in self.rng.sample(products, min(3, len(products)))]
+            lines.append(picked)
+        orders = OrderGroup.objects.bulk_create(
+            [
+                OrderGroup(
+                    user=self.rng.choice(users),
+                    total_price=sum(product.effective_price * quantity for product, quantity in picked),
+                    is_paid=self.rng.random() < 0.5,
+                    shipping_address='1 Benchmark Street',
+                    phone='9999999999',
+                )
+                for picked in lines
+            ],
+            batch_size=self.batch_size,
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, product=product, quantity=quantity, price=product.effective_price)
+                for order, picked in zip(orders, lines)
+                for product, quantity in picked
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def index_products(self, products):
+        rows = []
+        for product in products:
+            rows.extend(index_rows(product))
+            if len(rows) >= self.batch_size:
+                SearchTrigram.objects.bulk_create(rows, batch_size=self.batch_size)
+                rows = []
+        SearchTrigram.objects.bulk_create(rows, batch_size=self.batch_size)
@@ -0,0 +1,113 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+
+from . import instrumentation
+
+performance_logger = logging.getLogger('store.performance')
+
+# =====================
+# 👣 Visit Tracking
+# =====================
+# The home page used to write `last_visit`/`visit_count` into the DB-backed session
+# on every hit, which meant a django_session UPDATE per page view (and a new session
+# row for every anonymous visitor). The counter now lives in a signed cookie, so
+# tracking a visit costs no database write at all. It runs as middleware, outside
+# the view, so the cached home page body can still be reused.
+
+VISIT_COOKIE = 'store_visits'
+VISIT_COOKIE_SALT = 'store.visits'
+VISIT_COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+TRACKED_URL_NAMES = {'home'}
+
+
+def get_visit_info(request):
+    """Return ``(last_visit, visit_count)`` for the current visitor."""
+    data = request.get_signed_cookie(VISIT_COOKIE, default=None, salt=VISIT_COOKIE_SALT)
+    try:
+        visits = json.loads(data) if data else {}
+    except ValueError:
+        visits = {}
+    return visits.get('last'), visits.get('count', 0)
+
+
+class VisitTrackingMiddleware(MiddlewareMixin):
+    # MiddlewareMixin makes this work natively under both WSGI and ASGI
+    def process_response(self, request, response):
+        match = request.resolver_match
+        if match is None or match.url_name not in TRACKED_URL_NAMES or response.status_code != 200:
+            return response
+
+        _, count = get_visit_info(request)
+        response.set_signed_cookie(
+            VISIT_COOKIE, json.dumps({'last': str(datetime.now()), 'count': count + 1}), salt=VISIT_COOKIE_SALT,
+            max_age=VISIT_COOKIE_MAX_AGE, httponly=True, samesite='Lax',
+        )
+        # The body may be shared, but this response now carries a per-visitor cookie
+        patch_cache_control(response, private=True)
+        return response
+
+
+# =====================
+# ⏱ Performance Instrumentation
+# =====================
+# When STORE_INSTRUMENTATION is on, a sampled share of requests get their DB
+# queries, template rendering, cache lookups and total view time measured. The
+# numbers go out as a Server-Timing header (visible in the browser's network
+# panel) and one structured log line; query patterns that repeat within a
+# request are logged with the call site that issued them, which is how N+1s show
+# up. With the setting off the middleware removes itself at startup.
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'STORE_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'STORE_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.duplicate_threshold = getattr(settings, 'STORE_DUPLICATE_QUERY_THRESHOLD', 3)
+        instrumentation.install_hooks()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = instrumentation.RequestMetrics(self.duplicate_threshold)
+        token = instrumentation.bind(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(instrumentation.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            instrumentation.unbind(token)
+
+        response['Server-Timing'] = metrics.server_timing()
+        self.log(request, response, metrics)
+        return response
+
+    def log(self, request, response, metrics):
+        match = request.resolver_match
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }
+        performance_logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()), extra={'performance': fields}
+        )
+        for count, sql, site in metrics.duplicates():
+            performance_logger.warning(
+                'duplicate query x%d at %s (%s): %s', count, site, request.path, sql,
+                extra={'performance': {'path': request.path, 'count': count, 'call_site': site, 'sql': sql}},
+            )
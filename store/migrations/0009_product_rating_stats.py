@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    counts = {}
+    rows = Review.objects.values_list('product_id', 'rating').annotate(n=models.Count('id')).order_by()
+    for product_id, rating, n in rows:
+        counts.setdefault(product_id, {})[rating] = n
+    for product_id, by_rating in counts.items():
+        stats = {f'rating_{star}': by_rating.get(star, 0) for star in range(1, 6)}
+        stats['rating_count'] = sum(by_rating.values())
+        stats['rating_sum'] = sum(star * n for star, n in by_rating.items())
+        Product.objects.filter(pk=product_id).update(**stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_alter_order_date_alter_product_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
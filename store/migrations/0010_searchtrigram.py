@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:03
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of store.search's tokenizer as of this migration, so later
+# changes to the live search code can't alter what this backfill does.
+WORD_RE = re.compile(r'[a-z0-9]+')
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def trigrams(text):
+    grams = set()
+    for word in WORD_RE.findall((text or '').lower()):
+        padded = '  ' + word + ' '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_weights(name, description):
+    weights = dict.fromkeys(trigrams(description), DESCRIPTION_WEIGHT)
+    for gram in trigrams(name):
+        weights[gram] = weights.get(gram, 0) + NAME_WEIGHT
+    return weights
+
+
+def build_search_index(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    SearchTrigram = apps.get_model('store', 'SearchTrigram')
+    rows = []
+    for product in Product.objects.only('id', 'name', 'description').iterator():
+        rows.extend(
+            SearchTrigram(trigram=gram, product_id=product.pk, weight=weight)
+            for gram, weight in trigram_weights(product.name, product.description).items()
+        )
+    SearchTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to='store.product')),
+            ],
+            options={
+                'unique_together': {('trigram', 'product')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
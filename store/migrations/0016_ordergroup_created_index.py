@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_sku'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordergroup',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ),
+    ]
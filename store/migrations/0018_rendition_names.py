@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def reset_renditions(apps, schema_editor):
+    # Renditions are now named after the full image path; until `manage.py
+    # generate_thumbnails` rebuilds them under the new names, cards fall back to
+    # the original upload.
+    Product = apps.get_model('store', 'Product')
+    Product.objects.exclude(rendition_source='').update(rendition_source='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_inventory'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_renditions, migrations.RunPython.noop),
+    ]
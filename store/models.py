@@ -6,7 +6,7 @@ from django.utils import timezone
 # 🏷️ Category
 # =====================
 class Category(models.Model):
-    name = models.CharField(max_length=50)
+    name = models.CharField(max_length=50, db_index=True)
 
     def __str__(self):
         return self.name
@@ -17,23 +17,104 @@ class Category(models.Model):
 # =====================
 class Product(models.Model):
     name = models.CharField(max_length=100)
+    # Stock-keeping unit: the stable key used by import_catalog/export_catalog
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     price = models.DecimalField(default=0, decimal_places=2, max_digits=8)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, default=1)
     description = models.CharField(max_length=250, blank=True, null=True)
     image = models.ImageField(upload_to='uploads/product/')
     on_sale = models.BooleanField(default=False)
     sale_price = models.DecimalField(default=0, decimal_places=2, max_digits=8)
+    # Price actually charged (sale_price while on sale); stored so listings can sort on an index
+    effective_price = models.DecimalField(default=0, decimal_places=2, max_digits=8, editable=False)
+
+    # 🖼 Resized renditions of `image` (generated by store.images)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    rendition_source = models.CharField(max_length=100, blank=True, default='', editable=False)
+
+    # ⭐ Denormalized review aggregates (kept in sync by store.signals)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0, editable=False)
+
+    RATING_FIELDS = [
+        'rating_count', 'rating_sum', 'rating_avg', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+    ]
+    PRICE_FIELDS = {'price', 'on_sale', 'sale_price'}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'on_sale', 'price'], name='product_cat_sale_price_idx'),
+            # Keyset pagination sort keys (see store.pagination)
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['effective_price', 'id'], name='product_eff_price_idx'),
+            models.Index(fields=['rating_avg', 'id'], name='product_rating_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.effective_price = self.sale_price if self.on_sale else self.price
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.PRICE_FIELDS & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
+        super().save(*args, **kwargs)
+
     @property
     def average_rating(self):
-        reviews = self.review_set.all()
-        if reviews.exists():
-            return round(sum(r.rating for r in reviews) / reviews.count(), 1)
+        if self.rating_count:
+            return round(self.rating_sum / self.rating_count, 1)
         return 0
 
+    @property
+    def rating_histogram(self):
+        """Review counts per star, highest first: {5: n, 4: n, ..., 1: n}."""
+        return {star: getattr(self, f'rating_{star}') for star in range(5, 0, -1)}
+
+    @staticmethod
+    def rating_stats_from_counts(counts):
+        """Build the aggregate field values from a {rating: review_count} mapping."""
+        stats = {f'rating_{star}': counts.get(star, 0) for star in range(1, 6)}
+        stats['rating_count'] = sum(counts.values())
+        stats['rating_sum'] = sum(star * n for star, n in counts.items())
+        stats['rating_avg'] = stats['rating_sum'] / stats['rating_count'] if stats['rating_count'] else 0
+        return stats
+
+    def refresh_rating_stats(self):
+        """Recompute the rating aggregates from this product's reviews with one grouped query."""
+        counts = dict(
+            Review.objects.filter(product_id=self.pk)
+            .values_list('rating')
+            .annotate(n=models.Count('id'))
+        )
+        stats = self.rating_stats_from_counts(counts)
+        Product.objects.filter(pk=self.pk).update(**stats)
+        for field, value in stats.items():
+            setattr(self, field, value)
+
+
+# =====================
+# 🔍 Search Index
+# =====================
+class SearchTrigram(models.Model):
+    """One row per (trigram, product) pair; maintained by store.search on Product save."""
+    trigram = models.CharField(max_length=3)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_trigrams')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('trigram', 'product')
+
+    def __str__(self):
+        return f"{self.trigram!r} → {self.product_id}"
+
 
 # =====================
 # 🛒 CartItem
@@ -44,8 +125,12 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     added_on = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ('user', 'product')
+
     def total_price(self):
-        return self.product.price * self.quantity
+        product = self.product
+        return (product.sale_price if product.on_sale else product.price) * self.quantity
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} ({self.user.username})"
@@ -76,6 +161,17 @@ class OrderGroup(models.Model):
     is_paid = models.BooleanField(default=False)
     shipping_address = models.CharField(max_length=200, blank=True, default='')
     phone = models.CharField(max_length=15, blank=True, default='')
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_order_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            # Admin date filter and order export date ranges
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} by {self.user.username}"
@@ -106,10 +202,90 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('product', 'user')
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='review_product_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} rated {self.product.name} → {self.rating}⭐"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so moving a review to another product refreshes the old product's aggregates too
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        return instance
+
+
+# =====================
+# 📦 Inventory
+# =====================
+class Inventory(models.Model):
+    """Stock of one product; products without a row are not stock-tracked. Changed through store.inventory."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='inventory')
+    on_hand = models.PositiveIntegerField(default=0)
+    # Units held by open checkouts (StockReservation rows); available = on_hand - reserved
+    reserved = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name_plural = 'inventory'
+        indexes = [
+            # Only sold-out rows, so the listing pages' out-of-stock set is one small index read
+            models.Index(
+                fields=['product'], condition=models.Q(on_hand__lte=models.F('reserved')), name='inventory_sold_out_idx',
+            ),
+        ]
+
+    @property
+    def available(self):
+        return max(self.on_hand - self.reserved, 0)
+
+    def __str__(self):
+        return f"{self.product} — {self.on_hand} on hand, {self.reserved} reserved"
+
+
+class StockReservation(models.Model):
+    """Units held for a user's checkout until ``expires_at``; released by `manage.py release_reservations`."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'product')
+        indexes = [models.Index(fields=['expires_at'], name='reservation_expiry_idx')]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for {self.user_id} until {self.expires_at:%H:%M}"
+
+
+# =====================
+# 📧 Email Outbox
+# =====================
+class OutboxEmail(models.Model):
+    """An email queued in the same transaction as the change it reports; sent by run_outbox."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.CharField(max_length=200, blank=True, default='')
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)} ({self.status})"
+
 
 # =====================
 # 👤 Customer (Legacy - Optional)
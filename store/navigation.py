@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.db.models import Count
+from django.http import Http404
+
+from .caching import acatalog_version, catalog_version
+from .models import Category
+
+# =====================
+# 🧭 Category Navigation
+# =====================
+# Every page's navbar lists the categories with their product counts. The
+# list is built with one grouped query and cached under the catalog version
+# stamp, so any Category or Product change rebuilds it, and in the steady state
+# it costs no query at all. It is memoized on the request because the navbar
+# and the categories page both read it.
+
+NAV_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(version):
+    return f'store:category_nav:{version}'
+
+
+def _nav_rows():
+    return Category.objects.annotate(product_count=Count('product')).order_by('name', 'id').values('id', 'name', 'product_count')
+
+
+def category_nav(request=None):
+    """``[{id, name, product_count}, ...]`` for every category, by name."""
+    categories = getattr(request, '_store_category_nav', None)
+    if categories is None:
+        key = _cache_key(catalog_version(request))
+        categories = cache.get(key)
+        if categories is None:
+            categories = list(_nav_rows())
+            cache.set(key, categories, NAV_CACHE_TIMEOUT)
+        if request is not None:
+            request._store_category_nav = categories
+    return categories
+
+
+async def acategory_nav(request=None):
+    """Async category_nav(); async views await it so the navbar never queries from a sync context."""
+    categories = getattr(request, '_store_category_nav', None)
+    if categories is None:
+        key = _cache_key(await acatalog_version(request))
+        categories = await cache.aget(key)
+        if categories is None:
+            categories = [row async for row in _nav_rows()]
+            await cache.aset(key, categories, NAV_CACHE_TIMEOUT)
+        if request is not None:
+            request._store_category_nav = categories
+    return categories
+
+
+def get_nav_category_or_404(categories, category_id):
+    """The ``category_nav()`` entry for ``category_id``; saves a Category lookup on category pages."""
+    for category in categories:
+        if category['id'] == category_id:
+            return category
+    raise Http404("No Category matches the given query.")
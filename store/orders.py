@@ -0,0 +1,64 @@
+from django.db import IntegrityError, transaction
+
+from .cart import cart_lines
+from .inventory import commit_stock
+from .models import CartItem, OrderGroup, OrderItem
+from .outbox import enqueue_email
+from .user_state import invalidate_user_state
+
+
+def place_order(user, shipping_address, phone, is_paid, customer_name='', idempotency_key=None):
+    """
+    Turn the user's cart into an OrderGroup as one atomic unit.
+
+    Returns ``(order, created)``. ``order`` is None when the cart is empty, and an
+    existing order is returned with ``created=False`` when ``idempotency_key`` has
+    already been used, so a retried or double-clicked submit never orders twice.
+    The confirmation email is queued in the outbox within the same transaction, and
+    stock is taken with store.inventory.commit_stock(), which raises OutOfStock (and
+    nothing is ordered) when a tracked product can't cover its line.
+    """
+    idempotency_key = idempotency_key or None
+    try:
+        with transaction.atomic():
+            if idempotency_key:
+                existing = OrderGroup.objects.filter(user=user, idempotency_key=idempotency_key).first()
+                if existing:
+                    return existing, False
+
+            # Lock the cart rows so a concurrent submit waits for this one to finish
+            lines = list(
+                cart_lines(user.pk).select_for_update(of=('self',))
+                .values_list('product_id', 'quantity', 'unit_price', 'line_total')
+            )
+            if not lines:
+                return None, False
+            commit_stock(user.pk, {product_id: quantity for product_id, quantity, *_ in lines})
+
+            order = OrderGroup.objects.create(
+                user=user,
+                total_price=sum(line_total for *_, line_total in lines),
+                is_paid=is_paid,
+                shipping_address=shipping_address,
+                phone=phone,
+                idempotency_key=idempotency_key,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=quantity, price=price)
+                for product_id, quantity, price, _ in lines
+            ])
+            CartItem.objects.filter(user=user).delete()
+            enqueue_email(
+                subject='🛒 Order Confirmation',
+                message=f"Hi {customer_name or user.username}, your order has been placed successfully!",
+                recipient_list=[user.email],
+            )
+            invalidate_user_state(user.pk)
+    except IntegrityError:
+        # Lost a race with a concurrent submit carrying the same key; any other
+        # constraint failure is a real error and is re-raised as is
+        existing = idempotency_key and OrderGroup.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if not existing:
+            raise
+        return existing, False
+    return order, True
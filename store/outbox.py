@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# =====================
+# 📧 Transactional Email Outbox
+# =====================
+# Views enqueue mail with enqueue_email() inside their own transaction, so an email
+# exists if and only if the order (or other change) it describes was committed.
+# The run_outbox command delivers due messages in batches over a single SMTP
+# connection and retries failures with exponential backoff.
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+CLAIM_SECONDS = 300  # how long a worker owns a claimed batch before others may retry it
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    recipients = [address for address in recipient_list if address]
+    if not recipients:
+        return None
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or '',
+        recipients=recipients,
+    )
+
+
+def claim_batch(batch_size):
+    """Reserve up to ``batch_size`` due messages by pushing their next attempt past the claim window."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in due]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS)
+        )
+    return due
+
+
+def send_batch(batch_size=100, max_attempts=MAX_ATTEMPTS, connection=None):
+    """Deliver one batch of due messages. Returns ``(sent, failed)`` counts."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # SMTP is unreachable: the whole batch backs off and the worker keeps running
+        for email in batch:
+            _record_failure(email, exc, max_attempts)
+        return 0, len(batch)
+    with connection:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email or None,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                _record_failure(email, exc, max_attempts)
+                failed += 1
+            else:
+                OutboxEmail.objects.filter(pk=email.pk).update(
+                    status=OutboxEmail.SENT, sent_at=timezone.now(), attempts=email.attempts + 1, last_error=''
+                )
+                sent += 1
+    return sent, failed
+
+
+def _record_failure(email, exc, max_attempts):
+    attempts = email.attempts + 1
+    update = {'attempts': attempts, 'last_error': f"{type(exc).__name__}: {exc}"}
+    if attempts >= max_attempts:
+        update['status'] = OutboxEmail.FAILED
+    else:
+        update['next_attempt_at'] = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    OutboxEmail.objects.filter(pk=email.pk).update(**update)
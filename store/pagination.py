@@ -0,0 +1,167 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+# =====================
+# 🔢 Sort keys
+# =====================
+# name -> (Product field used as the sort key, descending?, cursor value parser)
+# Every ordering is tie-broken on id in the same direction, so (key, id) is unique
+# and the cursor can resume exactly where the previous page stopped. Each key has a
+# matching (key, id) index on Product.
+SORT_OPTIONS = {
+    'newest': (None, True, None),
+    'price': ('price', False, Decimal),
+    '-price': ('price', True, Decimal),
+    'effective_price': ('effective_price', False, Decimal),
+    '-effective_price': ('effective_price', True, Decimal),
+    'rating': ('rating_avg', True, float),
+}
+DEFAULT_SORT = 'newest'
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the decoded cursor list, or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    def __init__(self, object_list, sort, next_cursor):
+        self.object_list = object_list
+        self.sort = sort
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(queryset, sort=None, cursor=None, page_size=None):
+    """
+    Return one page of ``queryset`` ordered by ``sort`` and starting after ``cursor``.
+
+    Unlike OFFSET pagination, each page is a single indexed range scan, so the cost
+    of page N doesn't grow with N or with the size of the catalog.
+    """
+    queryset, sort, key, page_size = _keyset_query(queryset, sort, cursor, page_size)
+    return _keyset_result(list(queryset), sort, key, page_size)
+
+
+async def akeyset_page(queryset, sort=None, cursor=None, page_size=None):
+    """Async version of keyset_page() for async views."""
+    queryset, sort, key, page_size = _keyset_query(queryset, sort, cursor, page_size)
+    return _keyset_result([row async for row in queryset], sort, key, page_size)
+
+
+def _keyset_query(queryset, sort, cursor, page_size):
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    page_size = page_size or settings.STORE_PAGE_SIZE
+    key, descending, parse = SORT_OPTIONS[sort]
+
+    prefix = '-' if descending else ''
+    ordering = [f'{prefix}{key}', f'{prefix}id'] if key else [f'{prefix}id']
+    queryset = queryset.order_by(*ordering)
+
+    position = _parse_cursor(decode_cursor(cursor), parse)
+    if position is not None:
+        op = 'lt' if descending else 'gt'
+        if key:
+            value, last_id = position
+            # The leading `key >= value` bound lets the (key, id) index seek straight to the cursor
+            queryset = queryset.filter(
+                Q(**{f'{key}__{op}e': value}),
+                Q(**{f'{key}__{op}': value}) | Q(**{f'id__{op}': last_id}),
+            )
+        else:
+            queryset = queryset.filter(**{f'id__{op}': position[0]})
+
+    # One extra row tells us whether there is a next page
+    return queryset[:page_size + 1], sort, key, page_size
+
+
+def _keyset_result(rows, sort, key, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        # Rows are model instances, or dicts when the queryset is a values() query
+        value = last.__getitem__ if isinstance(last, dict) else partial(getattr, last)
+        if key:
+            next_cursor = encode_cursor([str(value(key)), value('id')])
+        else:
+            next_cursor = encode_cursor([value('id')])
+    return KeysetPage(rows, sort, next_cursor)
+
+
+def _parse_cursor(values, parse):
+    if values is None:
+        return None
+    try:
+        if parse is None:
+            return (int(values[0]),) if len(values) == 1 else None
+        if len(values) != 2:
+            return None
+        return parse(values[0]), int(values[1])
+    except (ValueError, TypeError, InvalidOperation):
+        return None
+
+
+# =====================
+# 🧮 Estimated counts (admin changelists)
+# =====================
+# An exact COUNT(*) over millions of rows is a full scan on every changelist page
+# load. Unfiltered changelists of large tables show an estimate instead: the
+# planner's row estimate on PostgreSQL, the highest primary key elsewhere (ids are
+# auto-increment and rows are rarely deleted). Filtered or small tables still get
+# an exact count.
+
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+def estimated_count(queryset):
+    """A cheap row estimate for an unfiltered queryset, or None when it can't be estimated."""
+    if queryset.query.where or queryset.query.is_sliced:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+    return queryset.aggregate(estimate=Max('pk'))['estimate'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
@@ -0,0 +1,132 @@
+import math
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Product, SearchTrigram
+
+# =====================
+# 🔍 Trigram Search Index
+# =====================
+# Every word of a product's name and description is split into padded trigrams
+# ("  ip", " ip", "iph", ... "ne ") and stored in SearchTrigram. A query is split the
+# same way and matched with one indexed ``trigram IN (...)`` lookup; products sharing
+# enough trigrams with the query are ranked by how many they share, which gives
+# prefix matching (the trailing pad is dropped for queries) and tolerance to typos.
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+MATCH_THRESHOLD = 0.5  # share of query trigrams a product must contain
+
+
+def trigrams(text, prefix=False):
+    grams = set()
+    for word in WORD_RE.findall((text or '').lower()):
+        padded = '  ' + word + ('' if prefix else ' ')
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_weights(name, description):
+    """Map each trigram of a product to its weight (name matches count more)."""
+    weights = dict.fromkeys(trigrams(description), DESCRIPTION_WEIGHT)
+    for gram in trigrams(name):
+        weights[gram] = weights.get(gram, 0) + NAME_WEIGHT
+    return weights
+
+
+def index_rows(product):
+    return [
+        SearchTrigram(trigram=gram, product_id=product.pk, weight=weight)
+        for gram, weight in trigram_weights(product.name, product.description).items()
+    ]
+
+
+def bulk_index(products, batch_size=10000):
+    """
+    Insert index rows for ``products`` that have none yet, with plain executemany.
+
+    Used by bulk loaders, where building a SearchTrigram instance per row would
+    cost more than the insert itself.
+    """
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}, {}, {}) VALUES (%s, %s, %s)'.format(
+        quote(SearchTrigram._meta.db_table), quote('trigram'), quote('product_id'), quote('weight'),
+    )
+    rows = []
+    with connection.cursor() as cursor:
+        for product in products:
+            rows.extend(
+                (gram, product.pk, weight)
+                for gram, weight in trigram_weights(product.name, product.description).items()
+            )
+            if len(rows) >= batch_size:
+                cursor.executemany(sql, rows)
+                rows = []
+        if rows:
+            cursor.executemany(sql, rows)
+
+
+def index_product(product):
+    with transaction.atomic():
+        SearchTrigram.objects.filter(product_id=product.pk).delete()
+        SearchTrigram.objects.bulk_create(index_rows(product))
+
+
+def ranked_matches(query, product_filter=None):
+    """
+    ``{product_id, hits, score}`` rows for ``query``, best match first.
+
+    ``product_filter`` is a Q over ``product__`` fields (e.g. facet selections).
+    """
+    grams = trigrams(query, prefix=True)
+    if not grams:
+        return SearchTrigram.objects.none().values('product_id')
+    needed = max(1, math.ceil(len(grams) * MATCH_THRESHOLD))
+    matches = SearchTrigram.objects.filter(trigram__in=grams)
+    if product_filter:
+        matches = matches.filter(product_filter)
+    return (
+        matches
+        .values('product_id')
+        .annotate(hits=Count('id'), score=Sum('weight'))
+        .filter(hits__gte=needed)
+        .order_by('-hits', '-score', 'product_id')
+    )
+
+
+def search_page(query, page_number=1, per_page=24, product_filter=None, count=None):
+    """
+    Return a Paginator page whose ``object_list`` holds the ranked Products.
+
+    Pass ``count`` when the number of matches is already known (e.g. from the facet counts).
+    """
+    paginator = Paginator(ranked_matches(query, product_filter), per_page)
+    if count is not None:
+        paginator.count = count
+    page = paginator.get_page(page_number)
+    ids = [row['product_id'] for row in page.object_list]
+    products = Product.objects.select_related('category').in_bulk(ids)
+    page.object_list = [products[pk] for pk in ids if pk in products]
+    return page
+
+
+def matching_products(query):
+    """Every Product matching ``query``, unranked (the scope for search facet counts)."""
+    return Product.objects.filter(pk__in=ranked_matches(query).values('product_id'))
+
+
+async def asearch_page(query, page_number=1, per_page=24, product_filter=None, count=None):
+    """Async search_page()."""
+    matches = ranked_matches(query, product_filter)
+    paginator = Paginator(matches, per_page)
+    # Paginator counts synchronously; prime its cached count with the async ORM
+    paginator.count = await matches.acount() if count is None else count
+    page = paginator.get_page(page_number)
+    ids = [row['product_id'] async for row in page.object_list]
+    products = await Product.objects.select_related('category').ain_bulk(ids)
+    page.object_list = [products[pk] for pk in ids if pk in products]
+    return page
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version
+from .inventory import release_holds
+from .models import Category, Product, Review, StockReservation
+from .search import index_product
+
+
+# ⭐ Keep Product rating aggregates in step with its reviews.
+# These run inside the caller's transaction, so the aggregates commit
+# (or roll back) together with the review write.
+@receiver(post_save, sender=Review)
+def update_product_rating_stats(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_product_id', None)
+    for product_id in {previous, instance.product_id} - {None}:
+        Product(pk=product_id).refresh_rating_stats()
+    instance._loaded_product_id = instance.product_id
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_rating_stats(sender, instance, origin=None, **kwargs):
+    # Deleting a product (or its category) cascades to its reviews; there is no product left to refresh
+    deleted = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if deleted not in (Product, Category):
+        Product(pk=instance.product_id).refresh_rating_stats()
+
+
+# 🔍 Re-index a product whenever its searchable text may have changed.
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    index_product(instance)
+
+
+# 🏷️ Any catalog change invalidates cached product cards and pages.
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_catalog_caches(sender, **kwargs):
+    bump_catalog_version()
+
+
+# 📦 Deleting a user cascades to their stock holds; give the held units back first.
+@receiver(pre_delete, sender=User)
+def release_user_holds(sender, instance, **kwargs):
+    release_holds(StockReservation.objects.filter(user_id=instance.pk))
@@ -0,0 +1,95 @@
+from django import template
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.template.loader import get_template
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from store.caching import catalog_version
+from store.images import RENDITIONS, rendition_name
+from store.inventory import out_of_stock_ids
+
+register = template.Library()
+
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+ACTIONS_SLOT = '<!-- product-card-actions -->'
+
+# Renditions offered in each srcset (the size itself plus the next one up for
+# high-density screens) and the matching `sizes` hint for the browser.
+SRCSET_RENDITIONS = {
+    'card': ('card', 'detail'),
+    'detail': ('detail', 'zoom'),
+    'zoom': ('zoom',),
+}
+SIZES = {
+    'card': '(min-width: 1200px) 25vw, (min-width: 768px) 33vw, 100vw',
+    'detail': '(min-width: 992px) 40vw, 100vw',
+    'zoom': '100vw',
+}
+
+
+@register.simple_tag
+def product_image(product, size='card', **attrs):
+    """
+    Render a product image as a responsive <picture> (WebP + JPEG srcset).
+
+    Usage: {% product_image product "card" class="card-img-top" style="height: 250px;" %}
+    Falls back to the original upload until its renditions have been generated.
+    """
+    if not product.image:
+        return ''
+    alt = attrs.pop('alt', product.name)
+    attrs.setdefault('loading', 'lazy')
+
+    if not product.image_width or product.rendition_source != product.image.name:
+        return format_html('<img src="{}" alt="{}"{}>', product.image.url, alt, flatatt(attrs))
+
+    widths = sorted({min(RENDITIONS[name], product.image_width) for name in SRCSET_RENDITIONS[size]})
+    width = widths[0]
+    height = round(product.image_height * width / product.image_width)
+
+    def srcset(ext):
+        return ', '.join(
+            f'{default_storage.url(rendition_name(product.image.name, w, ext))} {w}w' for w in widths
+        )
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" decoding="async"{}></picture>',
+        srcset('webp'), SIZES[size],
+        default_storage.url(rendition_name(product.image.name, width, 'jpg')), srcset('jpg'), SIZES[size],
+        width, height, alt, flatatt(attrs),
+    )
+
+
+@register.simple_tag(takes_context=True)
+def product_card(context, product, variant='home'):
+    """
+    Render a product card from ``store/cards/<variant>.html``.
+
+    Everything except the per-user cart/wishlist/stock buttons is cached per product and
+    keyed by the catalog version, so it is rendered once and reused until a Product,
+    Category or Review changes. The buttons come from ``<variant>_actions.html`` and
+    are rendered fresh for every request.
+    """
+    request = context.get('request')
+    key = f'store:card:{variant}:{product.pk}:{catalog_version(request)}'
+    parts = cache.get(key)
+    if parts is None:
+        html = get_template(f'store/cards/{variant}.html').render({
+            'product': product,
+            'actions': mark_safe(ACTIONS_SLOT),
+        })
+        parts = html.split(ACTIONS_SLOT, 1)
+        cache.set(key, parts, CARD_CACHE_TIMEOUT)
+
+    actions = get_template(f'store/cards/{variant}_actions.html').render({
+        'product': product,
+        'user': context.get('user'),
+        'request': request,
+        'cart_products': context.get('cart_products', ()),
+        'wishlist_products': context.get('wishlist_products', ()),
+        'out_of_stock': product.pk in out_of_stock_ids(request),
+    })
+    return mark_safe(actions.join(parts))
@@ -1,3 +1,1521 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import re
+import shutil
+import smtplib
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from ecommerce import urls as project_urls
+
+from . import async_views, urls as store_urls
+from .caching import catalog_version
+from .cart import MAX_LINE_QUANTITY, cart_summary
+from .context_processors import cart_item_count
+from .images import RENDITION_DIR, generate_renditions, rendition_name
+from .instrumentation import RequestMetrics
+from .inventory import out_of_stock_ids, release_expired, reserve_stock
+from .middleware import VISIT_COOKIE
+from .models import (
+    CartItem, Category, Inventory, OrderGroup, OrderItem, OutboxEmail, Product, Review, SearchTrigram, StockReservation,
+    Wishlist,
+)
+from .navigation import category_nav
+from .orders import place_order
+from .outbox import RETRY_BASE_SECONDS, enqueue_email, send_batch
+from .pagination import SORT_OPTIONS, EstimatedCountPaginator, encode_cursor, estimated_count, keyset_page
+from .search import ranked_matches
+from .user_state import load_user_state
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)')
+INDEX_SCAN = re.compile(r' USING (?:COVERING )?INDEX (\w+)')
+# Small lookup tables that are intentionally read in full
+FULL_SCAN_ALLOWED = {'store_category'}
+
+
+class StoreTestCase(TestCase):
+    """Runs against a throwaway MEDIA_ROOT and a cleared cache, so tests never touch real uploads or stale pages."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def product_image():
+        buffer = io.BytesIO()
+        Image.new('RGB', (8, 8), 'white').save(buffer, 'PNG')
+        return default_storage.save('uploads/product/test.png', ContentFile(buffer.getvalue()))
+
+    @classmethod
+    def create_products(cls, category, count, image):
+        return [
+            Product.objects.create(
+                name=f'Phone {category.name} {i}', description='Smartphone', category=category,
+                image=image, price=100 + i, on_sale=i % 3 == 0, sale_price=90,
+            )
+            for i in range(count)
+        ]
+
+
+# =====================
+# ⭐ Rating aggregates
+# =====================
+class RatingAggregateTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='Phone', category=Category.objects.create(name='Phones'), price=100, image=cls.product_image(),
+        )
+        cls.users = [User.objects.create_user(f'reviewer{i}') for i in range(3)]
+
+    def test_reviews_keep_the_product_aggregates_in_step(self):
+        reviews = [Review.objects.create(product=self.product, user=user, rating=rating)
+                   for user, rating in zip(self.users, [5, 4, 4])]
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (3, 13))
+        self.assertEqual(self.product.average_rating, 4.3)
+        self.assertEqual(self.product.rating_histogram, {5: 1, 4: 2, 3: 0, 2: 0, 1: 0})
+
+        reviews[0].rating = 1
+        reviews[0].save()
+        reviews[1].delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, {5: 0, 4: 1, 3: 0, 2: 0, 1: 1})
+        self.assertEqual(self.product.rating_avg, 2.5)
+
+    def test_moving_a_review_refreshes_both_products(self):
+        other = Product.objects.create(name='Tablet', category=self.product.category, price=200)
+        Review.objects.create(product=self.product, user=self.users[0], rating=5)
+        review = Review.objects.get()
+        review.product = other
+        review.save()
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.product.rating_count, other.rating_count), (0, 1))
+        self.assertEqual(other.rating_avg, 5)
+
+    def test_deleting_a_product_skips_the_per_review_refresh(self):
+        for user in self.users:
+            Review.objects.create(product=self.product, user=user, rating=4)
+        with CaptureQueriesContext(connection) as queries:
+            self.product.delete()
+        self.assertFalse([q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "store_product"')])
+        self.assertFalse(Review.objects.exists())
+
+    def test_product_page_reads_the_stored_average(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product', args=[self.product.id]))
+        self.assertEqual(response.context['average_rating'], 3.0)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'AVG(' in q['sql']])
+
+
+# =====================
+# 🔢 Keyset pagination
+# =====================
+class KeysetPaginationTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        image = cls.product_image()
+        # Lots of ties on price, so pages must be cut on (price, id), not on price alone
+        cls.products = [
+            Product.objects.create(
+                name=f'Phone {i}', category=category, image=image, price=[100, 200, 200, 200, 300][i % 5],
+            )
+            for i in range(17)
+        ]
+
+    def walk(self, sort):
+        ids, cursor = [], None
+        while True:
+            page = keyset_page(Product.objects.all(), sort=sort, cursor=cursor, page_size=4)
+            ids += [product.id for product in page]
+            if not page.has_next:
+                return ids
+            cursor = page.next_cursor
+
+    def test_pages_cover_tied_sort_keys_exactly_once(self):
+        by_price = sorted(self.products, key=lambda product: (product.price, product.id))
+        self.assertEqual(self.walk('price'), [product.id for product in by_price])
+        self.assertEqual(self.walk('-price'), [product.id for product in reversed(by_price)])
+        self.assertEqual(self.walk('newest'), sorted((product.id for product in self.products), reverse=True))
+
+    def test_malformed_cursor_restarts_from_the_first_page(self):
+        first = keyset_page(Product.objects.all(), sort='price', page_size=4)
+        for cursor in ['garbage', encode_cursor(['not-a-price', 1]), encode_cursor([1])]:
+            with self.subTest(cursor=cursor):
+                page = keyset_page(Product.objects.all(), sort='price', cursor=cursor, page_size=4)
+                self.assertEqual(page.object_list, first.object_list)
+
+    @override_settings(STORE_PAGE_SIZE=4)
+    def test_category_page_follows_its_next_cursor(self):
+        url = reverse('category_products', args=[self.products[0].category_id])
+        first = self.client.get(url, {'sort': 'price'})
+        cursor = first.context['products'].next_cursor
+        self.assertContains(first, f'sort=price&cursor={cursor}')
+        second = self.client.get(url, {'sort': 'price', 'cursor': cursor})
+        shown = [product.id for response in (first, second) for product in response.context['products']]
+        self.assertEqual(shown, self.walk('price')[:8])
+
+
+# =====================
+# 🔍 Trigram search
+# =====================
+class TrigramSearchTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        cls.iphone, cls.case, cls.galaxy = [
+            Product.objects.create(name=name, description=description, category=category, price=100)
+            for name, description in [
+                ('iPhone 15', 'Apple smartphone'), ('Leather case', 'Fits the iPhone 15'), ('Galaxy S24', 'Samsung flagship'),
+            ]
+        ]
+
+    def search(self, query):
+        return [row['product_id'] for row in ranked_matches(query)]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('iphone'), [self.iphone.id, self.case.id])
+        self.assertEqual(self.search('samsung'), [self.galaxy.id])
+        self.assertEqual(self.search('  '), [])
+
+    def test_prefixes_and_typos_still_match(self):
+        self.assertEqual(self.search('iphon')[0], self.iphone.id)
+        self.assertEqual(self.search('ipone')[0], self.iphone.id)
+        self.assertEqual(self.search('galxy'), [self.galaxy.id])
+        self.assertEqual(self.search('tablet'), [])
+
+    def test_index_follows_product_saves_and_deletes(self):
+        self.galaxy.name = 'Pixel 9'
+        self.galaxy.save()
+        self.assertEqual(self.search('pixel'), [self.galaxy.id])
+        self.assertEqual(self.search('galaxy'), [])
+        self.iphone.delete()
+        self.assertEqual(self.search('iphone'), [self.case.id])
+        self.assertFalse(SearchTrigram.objects.filter(product_id=self.iphone.id).exists())
+
+    def test_rebuild_search_index(self):
+        SearchTrigram.objects.all().delete()
+        self.assertEqual(self.search('iphone'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 product(s).', out.getvalue())
+        self.assertEqual(self.search('iphone'), [self.iphone.id, self.case.id])
+
+    def test_results_page_lists_products_in_rank_order(self):
+        response = self.client.get(reverse('search_results'), {'q': 'iphone'})
+        self.assertEqual([product.id for product in response.context['results']], [self.iphone.id, self.case.id])
+
+
+# =====================
+# 👤 Cart/wishlist membership
+# =====================
+class UserStateTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        cls.products = cls.create_products(category, 4, cls.product_image())
+        cls.user = User.objects.create_user('shopper', password='pw')
+        CartItem.objects.create(user=cls.user, product=cls.products[0], quantity=2)
+        Wishlist.objects.create(user=cls.user, product=cls.products[1])
+
+    def test_state_is_cached_until_a_mutation(self):
+        with self.assertNumQueries(2):
+            state = load_user_state(self.user.pk)
+        self.assertEqual((state.cart, state.wishlist), ({self.products[0].id}, {self.products[1].id}))
+        self.assertEqual(state.cart_quantities, {self.products[0].id: 2})
+        with self.assertNumQueries(0):
+            load_user_state(self.user.pk)
+
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('add_to_wishlist', args=[self.products[2].id]))
+        self.assertEqual(load_user_state(self.user.pk).wishlist, {self.products[1].id, self.products[2].id})
+
+    def test_cached_subtotal_follows_price_changes(self):
+        product = self.products[0]
+        before = load_user_state(self.user.pk).cart_subtotal
+        self.assertEqual(before, 2 * product.effective_price)
+        product.sale_price += 5
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(load_user_state(self.user.pk).cart_subtotal, before + 10)
+
+    def test_listing_marks_only_the_users_products(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'In Cart</button>', count=1)
+        self.assertContains(response, 'In Wishlist</button>', count=1)
+        self.assertContains(response, reverse('add_to_cart', args=[self.products[1].id]))
+        self.assertNotContains(response, reverse('add_to_cart', args=[self.products[0].id]))
+
+
+# =====================
+# 🛒 Cart badge
+# =====================
+class CartBadgeTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        cls.products = cls.create_products(category, 3, cls.product_image())
+        cls.user = User.objects.create_user('shopper', password='pw')
+        CartItem.objects.create(user=cls.user, product=cls.products[1], quantity=3)
+        CartItem.objects.create(user=cls.user, product=cls.products[2], quantity=1)
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return request
+
+    def test_badge_is_lazy_and_memoized(self):
+        with self.assertNumQueries(0):
+            badge = cart_item_count(self.request())
+        with self.assertNumQueries(2):
+            self.assertEqual(badge['cart_item_count'](), 2)
+        with self.assertNumQueries(0):
+            # 3 x ₹101 + 1 x ₹102, from the same memoized state
+            self.assertEqual(badge['cart_subtotal'](), Decimal('405.00'))
+
+    def test_badge_follows_cart_changes(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('about'))
+        self.assertEqual(response.context['cart_item_count'](), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('add_to_cart', args=[self.products[0].id]))
+        response = self.client.get(reverse('about'))
+        self.assertEqual(response.context['cart_item_count'](), 3)
+        self.assertContains(response, 'title="Subtotal: ₹')
+
+
+# =====================
+# 🧾 Order placement
+# =====================
+CHECKOUT_FORM = {'name': 'Shopper', 'address': '1 Main Street', 'phone': '5550100', 'payment_mode': 'cod'}
+
+
+class PlaceOrderTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', email='shopper@example.com', password='pw')
+        cls.product = Product.objects.create(name='Phone', category=Category.objects.create(name='Phones'), price=100)
+
+    def setUp(self):
+        super().setUp()
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+        self.client.force_login(self.user)
+
+    def test_double_submit_with_the_same_key_orders_once(self):
+        form = {**CHECKOUT_FORM, 'idempotency_key': 'key-1'}
+        self.client.post(reverse('checkout'), form)
+        response = self.client.post(reverse('checkout'), form, follow=True)
+        order = OrderGroup.objects.get()
+        self.assertContains(response, f"Order #{order.id} has already been placed.")
+        self.assertEqual(order.total_price, 200)
+        self.assertEqual(list(order.items.values_list('quantity', flat=True)), [2])
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_other_integrity_errors_are_not_mistaken_for_a_duplicate(self):
+        failure = IntegrityError('FOREIGN KEY constraint failed')
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=failure):
+            with self.assertRaises(IntegrityError):
+                place_order(self.user, 'Street', '1', is_paid=False, idempotency_key='key-2')
+        self.assertFalse(OrderGroup.objects.exists())
+
+
+class ConcurrentOrderTests(TransactionTestCase):
+    """Double-clicked or retried submits racing each other place a single order."""
+    THREADS = 8
+
+    def test_concurrent_submits_with_the_same_key_order_once(self):
+        user = User.objects.create_user('shopper', password='pw')
+        product = Product.objects.create(name='Phone', category=Category.objects.create(name='Phones'), price=100)
+        CartItem.objects.create(user=user, product=product, quantity=1)
+        errors = []
+        clients = []
+        for _ in range(self.THREADS):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def submit(client):
+            try:
+                response = client.post(reverse('checkout'), {**CHECKOUT_FORM, 'idempotency_key': 'same-key'})
+                if response.status_code >= 400:
+                    errors.append(response.content)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=[client]) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(OrderGroup.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+
+# =====================
+# 📧 Email outbox
+# =====================
+class FailingBackend(BaseEmailBackend):
+    """Refuses messages to ``bounce@example.com``; with ``refuse_connection`` it can't connect at all."""
+
+    def __init__(self, refuse_connection=False, **kwargs):
+        super().__init__(**kwargs)
+        self.refuse_connection = refuse_connection
+
+    def open(self):
+        if self.refuse_connection:
+            raise ConnectionRefusedError("Connection refused")
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@example.com' in message.to:
+                raise smtplib.SMTPRecipientsRefused({'bounce@example.com': (550, b'No such user')})
+            mail.outbox.append(message)
+        return len(messages)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.ok = enqueue_email('Order', 'Thanks!', ['buyer@example.com'])
+        self.bounce = enqueue_email('Order', 'Thanks!', ['bounce@example.com'])
+
+    def assertBackedOff(self, email, attempts=1):
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.attempts, attempts)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS - 5))
+        self.assertTrue(email.last_error)
+
+    def test_delivers_due_messages(self):
+        self.bounce.delete()
+        self.assertEqual(send_batch(), (1, 0))
+        self.assertEqual([message.to for message in mail.outbox], [['buyer@example.com']])
+        self.ok.refresh_from_db()
+        self.assertEqual((self.ok.status, self.ok.attempts), (OutboxEmail.SENT, 1))
+        self.assertEqual(send_batch(), (0, 0))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.assertEqual(send_batch(connection=FailingBackend()), (1, 1))
+        self.assertBackedOff(self.bounce)
+        self.assertEqual(send_batch(connection=FailingBackend()), (0, 0))
+
+    def test_unreachable_server_backs_off_the_whole_batch(self):
+        self.assertEqual(send_batch(connection=FailingBackend(refuse_connection=True)), (0, 2))
+        self.assertBackedOff(self.ok)
+        self.assertBackedOff(self.bounce)
+        self.assertEqual(mail.outbox, [])
+
+
+# =====================
+# 🧮 Cart summary
+# =====================
+class CartSummaryTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        cls.regular = Product.objects.create(name='Regular', category=category, price=Decimal('199.99'))
+        cls.sale = Product.objects.create(name='Deal', category=category, price=500, on_sale=True, sale_price=350)
+        cls.user = User.objects.create_user('shopper', password='pw')
+        CartItem.objects.create(user=cls.user, product=cls.regular, quantity=3)
+        CartItem.objects.create(user=cls.user, product=cls.sale, quantity=2)
+
+    def test_totals_use_the_sale_price_and_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            summary = cart_summary(self.user.pk)
+            lines = {line.product.name: (line.unit_price, line.line_total) for line in summary.lines}
+        self.assertEqual(lines, {'Regular': (Decimal('199.99'), Decimal('599.97')), 'Deal': (350, 700)})
+        self.assertEqual((summary.subtotal, summary.item_count, summary.line_count), (Decimal('1299.97'), 5, 2))
+
+    def test_cart_checkout_and_order_agree_on_the_total(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('cart')).context['total'], Decimal('1299.97'))
+        self.assertEqual(self.client.get(reverse('checkout')).context['total'], Decimal('1299.97'))
+        self.client.post(reverse('checkout'), {
+            'name': 'Shopper', 'address': '1 Main Street', 'phone': '5550100', 'payment_mode': 'cod',
+        })
+        order = OrderGroup.objects.get(user=self.user)
+        self.assertEqual(order.total_price, Decimal('1299.97'))
+        self.assertEqual(sorted(order.items.values_list('price', flat=True)), [Decimal('199.99'), Decimal('350.00')])
+
+
+# =====================
+# 🖼 Image renditions
+# =====================
+class RenditionTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        # The tests count the files they produced, so each one gets an empty media root
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def save_image(self, name, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 300), color).save(buffer, 'PNG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def renditions(self):
+        return sorted(default_storage.listdir(RENDITION_DIR)[1]) if default_storage.exists(RENDITION_DIR) else []
+
+    def test_saving_a_product_leaves_the_resizing_to_the_worker(self):
+        category = Category.objects.create(name='Phones')
+        old, new = self.save_image('uploads/product/old.png', 'red'), self.save_image('uploads/product/new.png', 'blue')
+        product = Product.objects.create(name='Phone', category=category, price=100, image=old)
+        Product.objects.create(name='Phone twin', category=category, price=100, image=old)
+        self.assertEqual(self.renditions(), [])
+        self.assertEqual(Product.objects.get(pk=product.pk).rendition_source, '')
+
+        call_command('generate_thumbnails', workers=1, stdout=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual((product.rendition_source, product.image_width), (old, 600))
+        self.assertEqual(len(self.renditions()), 4)  # 400 and 600 wide (never upscaled), WebP and JPEG
+
+        # Still used by the twin, so the old renditions survive the first swap
+        product.image = new
+        product.save()
+        call_command('generate_thumbnails', workers=1, stdout=io.StringIO())
+        self.assertEqual(len(self.renditions()), 8)
+
+        Product.objects.exclude(pk=product.pk).update(image=new)
+        call_command('generate_thumbnails', workers=1, stdout=io.StringIO())
+        self.assertEqual(self.renditions(), sorted(
+            rendition_name(new, width, ext).rsplit('/', 1)[1] for width in (400, 600) for ext in ('webp', 'jpg')
+        ))
+
+    def test_prune_deletes_renditions_of_no_current_image(self):
+        name = self.save_image('uploads/product/phone.png', 'red')
+        Product.objects.create(name='Phone', category=Category.objects.create(name='Phones'), price=100, image=name)
+        call_command('generate_thumbnails', workers=1, stdout=io.StringIO())
+        default_storage.save(f'{RENDITION_DIR}/phone-400.jpg', ContentFile(b'named before 0018'))
+        out = io.StringIO()
+        call_command('generate_thumbnails', prune=True, stdout=out)
+        self.assertIn('Pruned 1 orphaned', out.getvalue())
+        self.assertEqual(len(self.renditions()), 4)
+
+    def test_images_with_the_same_stem_keep_their_own_renditions(self):
+        names = [
+            self.save_image('uploads/product/a/foo.png', 'red'),
+            self.save_image('uploads/product/b/foo.png', 'blue'),
+        ]
+        for name in names:
+            self.assertEqual(generate_renditions(name), (600, 300))
+        renditions = [rendition_name(name, 400, 'jpg') for name in names]
+        self.assertNotEqual(renditions[0], renditions[1])
+        colors = []
+        for rendition in renditions:
+            with default_storage.open(rendition) as f:
+                colors.append(Image.open(f).convert('RGB').getpixel((0, 0)))
+        self.assertGreater(colors[0][0], 200)
+        self.assertGreater(colors[1][2], 200)
+
+
+# =====================
+# 🧩 Catalog version stamp
+# =====================
+class CatalogVersionTests(StoreTestCase):
+    def test_rebuilding_rating_stats_bumps_the_catalog_version(self):
+        product = Product.objects.create(name='Phone', category=Category.objects.create(name='Phones'), price=100)
+        Review.objects.create(product=product, user=User.objects.create_user('shopper'), rating=5)
+        # Simulate drifted aggregates written behind the signals' back
+        Product.objects.filter(pk=product.pk).update(rating_count=0, rating_avg=0, rating_5=0)
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_rating_stats', stdout=io.StringIO())
+        self.assertNotEqual(catalog_version(), version)
+        self.assertEqual(Product.objects.values_list('rating_count', flat=True).get(pk=product.pk), 1)
+
+
+# =====================
+# 📄 Anonymous page cache
+# =====================
+class PageCacheTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Phone', category=Category.objects.create(name='Phones'), price=100)
+        cls.url = reverse('product', args=[cls.product.id])
+
+    def test_page_is_served_from_cache_until_the_catalog_changes(self):
+        self.assertContains(self.client.get(self.url), 'Phone')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STORE_PAGE_CACHE_MAX_AGE}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Phone Pro'
+            self.product.save()
+        self.assertContains(self.client.get(self.url), 'Phone Pro')
+
+    def test_matching_etag_gets_a_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_logged_in_pages_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(User.objects.create_user('shopper'))
+        response = self.client.get(self.url)
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+        self.assertContains(response, reverse('add_to_cart', args=[self.product.id]))
+
+
+# =====================
+# 👣 Visit tracking
+# =====================
+class VisitTrackingTests(StoreTestCase):
+    def test_home_visits_are_counted_in_a_signed_cookie(self):
+        for _ in range(3):
+            response = self.client.get(reverse('home'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(self.client.get(reverse('about')).context['visit_count'], 3)
+
+    def test_tampered_cookie_starts_over(self):
+        self.client.get(reverse('home'))
+        forged = self.client.cookies[VISIT_COOKIE].value.replace('"count": 1', '"count": 99')
+        self.assertNotEqual(forged, self.client.cookies[VISIT_COOKIE].value)
+        self.client.cookies[VISIT_COOKIE] = forged
+        self.assertEqual(self.client.get(reverse('about')).context['visit_count'], 0)
+        self.client.get(reverse('home'))
+        self.assertEqual(self.client.get(reverse('about')).context['visit_count'], 1)
+
+
+# =====================
+# 🔎 Query plans
+# =====================
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite-specific")
+class QueryPlanTests(StoreTestCase):
+    """Every query issued by the store views must be served by an index, not a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Electronics')
+        cls.products = cls.create_products(cls.category, 30, cls.product_image())
+        cls.user = User.objects.create_user('shopper', email='shopper@example.com', password='pw')
+        Review.objects.create(product=cls.products[0], user=cls.user, rating=4, comment='Good')
+        CartItem.objects.create(user=cls.user, product=cls.products[0], quantity=2)
+        Wishlist.objects.create(user=cls.user, product=cls.products[1])
+
+    def full_scans(self, sql, params=()):
+        tables = set(connection.introspection.table_names())
+        with connection.cursor() as cursor:
+            # A partial index only holds the rows matching its WHERE, so walking it is bounded too
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")
+            partial = {name for name, in cursor.fetchall()}
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        # Walking an index in sort order up to a LIMIT is bounded; a bare SCAN of the table never is
+        ordered = ' LIMIT ' in sql and not any('TEMP B-TREE FOR ORDER BY' in step for step in plan)
+        scans = []
+        for step in plan:
+            match = FULL_SCAN.match(step)
+            if not match or match.group(1) not in tables or match.group(1) in FULL_SCAN_ALLOWED:
+                continue
+            index = INDEX_SCAN.search(step)
+            if index and (ordered or index.group(1) in partial):
+                continue
+            # A bare SCAN walks the table in rowid order: bounded only for an unfiltered ORDER BY id ... LIMIT
+            if not index and ordered and ' WHERE ' not in sql and f'ORDER BY "{match.group(1)}"."id"' in sql:
+                continue
+            scans.append(step)
+        return scans
+
+    def assertNoFullScans(self, client, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            getattr(client, method)(url, data)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            with self.subTest(url=url, sql=sql[:120]):
+                self.assertEqual(self.full_scans(sql), [])
+
+    def catalog_urls(self):
+        product = self.products[0]
+        urls = [
+            reverse('home'),
+            reverse('product', args=[product.id]),
+            reverse('categories'),
+            reverse('category_products', args=[self.category.id]),
+            reverse('search_results') + '?q=phone',
+            reverse('api_product', args=[product.id]),
+            reverse('api_product_reviews', args=[product.id]),
+            reverse('api_categories'),
+            f"{reverse('api_products')}?category={self.category.id}",
+            f"{reverse('category_products', args=[self.category.id])}?price=under-1000&on_sale=1&rating=4",
+            f"{reverse('search_results')}?q=phone&price=under-1000&on_sale=1&category={self.category.id}",
+        ]
+        for sort in SORT_OPTIONS:
+            cursor = keyset_page(Product.objects.all(), sort, page_size=10).next_cursor
+            urls.append(f"{reverse('home')}?sort={sort}")
+            urls.append(f"{reverse('home')}?sort={sort}&cursor={cursor}")
+            urls.append(f"{reverse('product_page')}?sort={sort}&cursor={cursor}")
+            urls.append(f"{reverse('api_products')}?sort={sort}&cursor={cursor}")
+        return urls
+
+    def test_limit_does_not_hide_a_filtered_scan(self):
+        for queryset in [
+            Product.objects.filter(description='Smartphone').order_by('-id')[:24],
+            Product.objects.filter(description='Smartphone').order_by('name')[:24],
+        ]:
+            sql, params = queryset.query.sql_with_params()
+            with self.subTest(sql=sql):
+                self.assertEqual(self.full_scans(sql, params), ['SCAN store_product'])
+
+    def test_anonymous_catalog_pages(self):
+        for url in self.catalog_urls():
+            self.assertNoFullScans(self.client, 'get', url)
+
+    def test_logged_in_pages(self):
+        self.client.force_login(self.user)
+        for url in self.catalog_urls() + [reverse('cart'), reverse('checkout'), reverse('wishlist_view')]:
+            self.assertNoFullScans(self.client, 'get', url)
+
+    def test_cart_and_review_mutations(self):
+        self.client.force_login(self.user)
+        product = self.products[2]
+        item = CartItem.objects.get(user=self.user, product=self.products[0])
+        self.assertNoFullScans(self.client, 'get', reverse('add_to_cart', args=[product.id]))
+        self.assertNoFullScans(self.client, 'post', reverse('update_cart', args=[item.id]), {'action': 'increase'})
+        self.assertNoFullScans(self.client, 'get', reverse('add_to_wishlist', args=[product.id]))
+        self.assertNoFullScans(self.client, 'post', reverse('submit_review', args=[product.id]), {'rating': 5, 'comment': 'Great'})
+        self.assertNoFullScans(self.client, 'post', reverse('checkout'), {
+            'name': 'Shopper', 'address': 'Street 1', 'phone': '9999999999', 'payment_mode': 'COD',
+        })
+
+
+# =====================
+# ⏱ Performance instrumentation
+# =====================
+class InstrumentationTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Phone', category=Category.objects.create(name='Phones'), price=100)
+
+    @override_settings(STORE_INSTRUMENTATION=True, STORE_INSTRUMENTATION_SAMPLE_RATE=1.0)
+    def test_server_timing_reports_the_request_queries(self):
+        client = Client()
+        client.force_login(User.objects.create_user('shopper'))
+        url = reverse('product', args=[self.product.id])
+        with CaptureQueriesContext(connection) as queries, self.assertLogs('store.performance', 'INFO') as logs:
+            response = client.get(url)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+        self.assertIn(f'path={url}', logs.output[0])
+
+    @override_settings(STORE_INSTRUMENTATION=False)
+    def test_disabled_instrumentation_adds_no_header(self):
+        self.assertNotIn('Server-Timing', Client().get(reverse('about')))
+
+    def test_repeated_queries_are_reported_with_their_call_site(self):
+        metrics = RequestMetrics(duplicate_threshold=3)
+        for product_id in (1, 2, 3):
+            metrics.record_query(f'SELECT * FROM store_product WHERE id IN ({", ".join(["%s"] * product_id)})', 0.001)
+        metrics.record_query('SELECT 1', 0.001)
+        [(count, sql, site)] = metrics.duplicates()
+        self.assertEqual((count, sql), (3, 'SELECT * FROM store_product WHERE id IN (...)'))
+        self.assertIn('store/tests.py', site)
+
+
+# =====================
+# 📊 Query budgets
+# =====================
+# Upper bounds on the SQL queries each route may issue. They must not depend on
+# catalog, cart, wishlist or review counts; a template or view change that
+# reintroduces an N+1 pushes a route over its budget.
+
+ANONYMOUS_BUDGETS = {
+    'home': 1,
+    'about': 0,
+    'product': 3,
+    'product_page': 1,
+    'categories': 0,
+    'category_products': 2,
+    'search_results': 4,
+    'login': 0,
+    'register': 0,
+    'api_products': 1,
+    'api_product': 1,
+    'api_product_reviews': 1,
+    'api_categories': 1,
+}
+LOGGED_IN_BUDGETS = {
+    'home': 5,
+    'about': 4,
+    'product': 7,
+    'product_page': 5,
+    'categories': 4,
+    'category_products': 6,
+    'search_results': 8,
+    'cart': 5,
+    'checkout': 7,
+    'wishlist_view': 5,
+}
+MUTATION_BUDGETS = {
+    'add_to_cart': 4,
+    'update_cart': 3,
+    'update_cart_batch': 8,
+    'add_to_wishlist': 7,
+    'remove_from_wishlist': 3,
+    'submit_review': 13,
+    'checkout': 11,
+}
+
+
+class QueryBudgetTests(StoreTestCase):
+    PRODUCTS_PER_CATEGORY = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.image = cls.product_image()
+        cls.user = User.objects.create_user('shopper', email='shopper@example.com', password='pw')
+        cls.reviewers = [User.objects.create_user(f'reviewer{i}', password='pw') for i in range(5)]
+        cls.categories = [Category.objects.create(name=name) for name in ('Phones', 'Laptops', 'Audio')]
+        cls.grow_catalog(cls.PRODUCTS_PER_CATEGORY)
+        cls.product = Product.objects.order_by('id').first()
+        cls.category = cls.categories[0]
+
+    @classmethod
+    def grow_catalog(cls, per_category):
+        """Add products, cart lines, wishlist entries and reviews; none of it may change a query count."""
+        products = [
+            product for category in cls.categories
+            for product in cls.create_products(category, per_category, cls.image)
+        ]
+        CartItem.objects.bulk_create(CartItem(user=cls.user, product=product, quantity=2) for product in products[:10])
+        Wishlist.objects.bulk_create(Wishlist(user=cls.user, product=product) for product in products[10:20])
+        for product in products[:3]:
+            for reviewer in cls.reviewers:
+                Review.objects.create(product=product, user=reviewer, rating=4, comment='Solid')
+
+    def get_routes(self):
+        product_args = {
+            'product': [self.product.id],
+            'category_products': [self.category.id],
+            'api_product': [self.product.id],
+            'api_product_reviews': [self.product.id],
+        }
+        query = {'search_results': '?q=phone'}
+        return {
+            name: reverse(name, args=product_args.get(name, [])) + query.get(name, '')
+            for name in {**ANONYMOUS_BUDGETS, **LOGGED_IN_BUDGETS}
+        }
+
+    def count_queries(self, method, url, data=None):
+        cache.clear()
+        # The category navigation and sold-out set are shared by every visitor and warm in the steady state
+        category_nav()
+        out_of_stock_ids()
+        extra = {'content_type': 'application/json'} if isinstance(data, str) else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, **extra)
+        self.assertLess(response.status_code, 400, url)
+        return len(queries), '\n'.join(query['sql'] for query in queries.captured_queries)
+
+    def assertWithinBudget(self, budgets, method='get'):
+        for name, url in self.get_routes().items():
+            if name not in budgets:
+                continue
+            with self.subTest(route=name):
+                count, sql = self.count_queries(method, url)
+                self.assertLessEqual(count, budgets[name], f"{url} ran {count} queries:\n{sql}")
+
+    def test_anonymous_routes(self):
+        self.assertWithinBudget(ANONYMOUS_BUDGETS)
+
+    def test_logged_in_routes(self):
+        self.client.force_login(self.user)
+        self.assertWithinBudget(LOGGED_IN_BUDGETS)
+
+    def test_mutations(self):
+        self.client.force_login(self.user)
+        item = CartItem.objects.filter(user=self.user).first()
+        target = Product.objects.exclude(cartitem__user=self.user).exclude(wishlist__user=self.user).first()
+        requests = [
+            ('add_to_cart', 'get', reverse('add_to_cart', args=[target.id]), None),
+            ('update_cart', 'post', reverse('update_cart', args=[item.id]), {'action': 'increase'}),
+            ('add_to_wishlist', 'get', reverse('add_to_wishlist', args=[target.id]), None),
+            ('remove_from_wishlist', 'get', reverse('remove_from_wishlist', args=[target.id]), None),
+            ('update_cart_batch', 'post', reverse('update_cart_batch'), json.dumps({'lines': [
+                {'product_id': target.id, 'delta': 2}, {'product_id': item.product_id, 'quantity': 0},
+            ]})),
+            ('submit_review', 'post', reverse('submit_review', args=[self.product.id]), {'rating': 5, 'comment': 'Great'}),
+            ('checkout', 'post', reverse('checkout'), {
+                'name': 'Shopper', 'address': 'Street 1', 'phone': '9999999999', 'payment_mode': 'COD',
+            }),
+        ]
+        for name, method, url, data in requests:
+            with self.subTest(route=name):
+                count, sql = self.count_queries(method, url, data)
+                self.assertLessEqual(count, MUTATION_BUDGETS[name], f"{url} ran {count} queries:\n{sql}")
+
+    def test_category_navigation_is_cached_per_catalog_version(self):
+        cache.clear()
+        with self.assertNumQueries(1):
+            category_nav()
+        with self.assertNumQueries(0):
+            self.client.get(reverse('about'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Extra', category=self.category, image=self.image, price=1)
+        counts = {row['id']: row['product_count'] for row in category_nav()}
+        self.assertEqual(counts[self.category.id], Product.objects.filter(category=self.category).count())
+
+    def test_counts_do_not_grow_with_catalog(self):
+        self.client.force_login(self.user)
+        routes = self.get_routes()
+        before = {name: self.count_queries('get', url)[0] for name, url in routes.items()}
+        self.grow_catalog(self.PRODUCTS_PER_CATEGORY)
+        after = {name: self.count_queries('get', url)[0] for name, url in routes.items()}
+        self.assertEqual(before, after)
+
+
+# =====================
+# 🧪 Synthetic data & benchmark
+# =====================
+class SeedAndBenchTests(TransactionTestCase):
+    """Committed data, because the benchmark's worker threads read it over their own connections."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        cache.clear()
+
+    def test_seeded_catalog_is_consistent_and_benchmarkable(self):
+        call_command(
+            'seed_catalog', categories=3, products=40, users=5, reviews=60, orders=8, images=2, stdout=io.StringIO(),
+        )
+        self.assertEqual((Category.objects.count(), Product.objects.count(), User.objects.count()), (3, 40, 5))
+        self.assertEqual(OrderGroup.objects.count(), 8)
+        # Bulk-loaded rows still get their aggregates and search index
+        reviewed = Product.objects.filter(rating_count__gt=0)
+        self.assertEqual(sum(reviewed.values_list('rating_count', flat=True)), Review.objects.count())
+        self.assertTrue(SearchTrigram.objects.exists())
+
+        out = io.StringIO()
+        call_command('bench', requests=40, warmup=5, concurrency=2, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual((report['requests'], report['errors'], report['mode']), (40, 0, 'in-process'))
+        self.assertLessEqual(report['p50_ms'], report['p95_ms'])
+
+
+# =====================
+# 📦 Catalog import/export
+# =====================
+class CatalogImportExportTests(StoreTestCase):
+    def write(self, name, content):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = f'{directory}/{name}'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_upserts_by_sku_and_export_round_trips(self):
+        csv_path = self.write('catalog.csv', (
+            'sku,name,category,price,on_sale,sale_price,description,image\n'
+            'PH-1,Phone One,Phones,100.00,yes,80.00,Dual SIM,\n'
+            'LP-1,Laptop One,Laptops,900.00,no,0,,\n'
+            ',Nameless,Phones,1,no,0,,\n'
+        ))
+        err = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_catalog', csv_path, stdout=io.StringIO(), stderr=err)
+        self.assertIn('Row 3: sku, name and category are required', err.getvalue())
+        phone = Product.objects.get(sku='PH-1')
+        self.assertEqual((phone.category.name, phone.effective_price), ('Phones', Decimal('80.00')))
+        self.assertEqual([row['product_id'] for row in ranked_matches('phone').values('product_id')], [phone.id])
+
+        jsonl_path = self.write(
+            'update.jsonl', '{"sku": "PH-1", "name": "Phone One", "category": "Phones", "price": "120"}\n',
+        )
+        call_command('import_catalog', jsonl_path, stdout=io.StringIO())
+        self.assertEqual(Product.objects.count(), 2)
+        phone.refresh_from_db()
+        self.assertEqual((phone.price, phone.on_sale, phone.effective_price), (120, False, 120))
+
+        export_path = self.write('export.jsonl', '')
+        call_command('export_catalog', export_path, stderr=io.StringIO())
+        with open(export_path, encoding='utf-8') as f:
+            rows = {row['sku']: row for row in map(json.loads, f)}
+        self.assertEqual(set(rows), {'PH-1', 'LP-1'})
+        self.assertEqual((rows['LP-1']['category'], Decimal(rows['LP-1']['price'])), ('Laptops', 900))
+
+    def test_products_without_a_sku_round_trip_without_duplicates(self):
+        phones = Category.objects.create(name='Phones')
+        product = Product.objects.create(name='Unlabelled', category=phones, price=10)
+        export_path = self.write('export.csv', '')
+        call_command('export_catalog', export_path, stderr=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.sku, f'ID-{product.pk}')
+
+        call_command('import_catalog', export_path, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_category_export_imports_with_the_categories_flag(self):
+        Category.objects.create(name='Phones')
+        Category.objects.create(name='Laptops')
+        export_path = self.write('categories.csv', '')
+        call_command('export_catalog', export_path, categories=True, stderr=io.StringIO())
+        Category.objects.filter(name='Laptops').delete()
+
+        out = io.StringIO()
+        call_command('import_catalog', export_path, categories=True, stdout=out)
+        self.assertIn('1 created', out.getvalue())
+        self.assertEqual(sorted(Category.objects.values_list('name', flat=True)), ['Laptops', 'Phones'])
+        self.assertFalse(Product.objects.exists())
+
+    def test_import_from_stdin_leaves_stdin_open(self):
+        stdin = io.StringIO('sku,name,category,price\nPH-1,Phone One,Phones,100\n')
+        with mock.patch('sys.stdin', stdin):
+            call_command('import_catalog', '-', stdout=io.StringIO())
+        self.assertFalse(stdin.closed)
+        self.assertTrue(Product.objects.filter(sku='PH-1').exists())
+
+
+# =====================
+# 📤 Order export
+# =====================
+class OrderExportTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='pw')
+        buyer = User.objects.create_user('buyer', email='buyer@example.com')
+        category = Category.objects.create(name='Phones')
+        product = Product.objects.create(name='Phone', sku='PH-1', category=category, price=100)
+        cls.orders = []
+        for day, quantity in [(1, 2), (15, 1)]:
+            order = OrderGroup.objects.create(
+                user=buyer, total_price=100 * quantity, is_paid=True, shipping_address='Street', phone='1',
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=100)
+            OrderGroup.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime(2026, 3, day, 12)))
+            cls.orders.append(order)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        return self.client.get(reverse('admin:store_ordergroup_export'), params)
+
+    def test_csv_export_streams_one_row_per_line_item_in_range(self):
+        response = self.export(start='2026-03-10', end='2026-03-31', format='csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders-2026-03-10-2026-03-31.csv"')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(int(row['order_id']), row['sku'], row['quantity'], row['line_total']) for row in rows],
+                         [(self.orders[1].id, 'PH-1', '1', '100.00')])
+
+    def test_jsonl_export_nests_the_line_items(self):
+        response = self.export(end='2026-03-01', format='jsonl')
+        [order] = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(order['order_id'], self.orders[0].id)
+        self.assertEqual((order['email'], order['order_total']), ('buyer@example.com', '200.00'))
+        self.assertEqual([(item['quantity'], item['line_total']) for item in order['items']], [(2, '200.00')])
+
+    def test_bad_parameters_are_rejected(self):
+        response = self.export(start='03/10/2026')
+        self.assertContains(response, 'start must be a date in YYYY-MM-DD format', status_code=400)
+        self.assertContains(self.export(format='xlsx'), 'format must be one of: csv, jsonl', status_code=400)
+
+
+# =====================
+# 🧮 Estimated counts
+# =====================
+class EstimatedCountTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        categories = [Category.objects.create(name=f'Category {i}') for i in range(5)]
+        categories[1].delete()
+        self.queryset = Category.objects.order_by('id')
+
+    def test_unfiltered_estimate_is_the_highest_id(self):
+        self.assertEqual(estimated_count(self.queryset), self.queryset.last().id)
+        self.assertIsNone(estimated_count(self.queryset.filter(name='Category 0')))
+
+    def test_large_unfiltered_tables_skip_the_count_query(self):
+        with mock.patch('store.pagination.ESTIMATED_COUNT_THRESHOLD', 2):
+            paginator = EstimatedCountPaginator(self.queryset, 2)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(paginator.count, self.queryset.last().id)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+            self.assertEqual(EstimatedCountPaginator(self.queryset.exclude(name='Category 0'), 2).count, 3)
+
+    def test_small_tables_get_an_exact_count(self):
+        self.assertEqual(EstimatedCountPaginator(self.queryset, 2).count, 4)
+
+
+# =====================
+# ⚡ Async read views
+# =====================
+def reload_urlconf():
+    importlib.reload(store_urls)
+    importlib.reload(project_urls)
+    clear_url_caches()
+
+
+class AsyncViewTests(StoreTestCase):
+    """The catalog pages as routed under the ASGI profile (STORE_ASYNC_VIEWS on)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(reload_urlconf)
+        cls.enterClassContext(override_settings(STORE_ASYNC_VIEWS=True))
+        reload_urlconf()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='pw')
+        category = Category.objects.create(name='Phones')
+        cls.phone = Product.objects.create(name='Pixel phone', price=500, category=category)
+        cls.sold_out = Product.objects.create(name='Sold out phone', price=300, category=category)
+        Inventory.objects.create(product=cls.sold_out, on_hand=0)
+        Review.objects.create(product=cls.phone, user=cls.user, rating=4, comment='Solid battery')
+
+    def test_catalog_urls_resolve_to_the_async_views(self):
+        self.assertIs(resolve(reverse('home')).func, async_views.home)
+        self.assertIs(resolve(reverse('product', args=[self.phone.id])).func, async_views.product)
+
+    async def test_anonymous_pages_are_rendered_and_cached(self):
+        self.assertContains(await self.async_client.get(reverse('home')), 'Pixel phone')
+        url = reverse('product', args=[self.phone.id])
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Solid battery')
+        # A queryset update skips the signals, so the catalog version (and the cached page) stay put
+        await Product.objects.filter(pk=self.phone.pk).aupdate(name='Renamed phone')
+        cached = await self.async_client.get(url)
+        self.assertEqual(cached['Cache-Control'], f'public, max-age={settings.STORE_PAGE_CACHE_MAX_AGE}')
+        self.assertEqual(cached.content, response.content)
+
+    async def test_product_page_reflects_the_users_cart(self):
+        await CartItem.objects.acreate(user=self.user, product=self.phone, quantity=2)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('product', args=[self.phone.id]))
+        self.assertContains(response, 'Already in Cart (2)')
+        response = await self.async_client.get(reverse('product', args=[self.sold_out.id]))
+        self.assertContains(response, 'Out of Stock')
+        response = await self.async_client.get(reverse('product', args=[self.sold_out.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_search_and_category_pages(self):
+        response = await self.async_client.get(reverse('search_results'), {'q': 'pixel'})
+        self.assertContains(response, 'Pixel phone')
+        self.assertNotContains(response, 'Sold out phone')
+        response = await self.async_client.get(reverse('category_products', args=[self.phone.category_id]))
+        self.assertContains(response, 'Sold out phone')
+
+
+# =====================
+# 📡 JSON API
+# =====================
+class CatalogApiTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Phones')
+        cls.products = cls.create_products(cls.category, 30, cls.product_image())
+        cls.user = User.objects.create_user('reviewer', password='pw')
+        Review.objects.create(product=cls.products[0], user=cls.user, rating=4, comment='Good')
+
+    def test_cursor_walks_every_product_once(self):
+        seen, cursor = [], None
+        while True:
+            url = f"{reverse('api_products')}?sort=price&limit=7&fields=id" + (f'&cursor={cursor}' if cursor else '')
+            data = self.client.get(url).json()
+            self.assertTrue(all(list(row) == ['id'] for row in data['results']))
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertCountEqual(seen, [product.id for product in self.products])
+
+    def test_product_embeds_rating_aggregates(self):
+        data = self.client.get(reverse('api_product', args=[self.products[0].id])).json()
+        self.assertEqual(data['rating'], {'average': 4.0, 'count': 1, 'histogram': {'5': 0, '4': 1, '3': 0, '2': 0, '1': 0}})
+        self.assertEqual(data['category'], {'id': self.category.id, 'name': 'Phones'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api_products') + '?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_error_responses_are_never_revalidated(self):
+        for url, status in [(reverse('api_products') + '?fields=secret', 400), (reverse('api_product', args=[0]), 404)]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status)
+            self.assertNotIn('public', response.get('Cache-Control', ''))
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response.get('ETag', '*')).status_code, status)
+
+    def test_etag_revalidation_skips_the_database(self):
+        url = reverse('api_product_reviews', args=[self.products[0].id])
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.products[0], user=User.objects.create_user('other'), rating=2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# =====================
+# 🎛️ Facets
+# =====================
+class FacetTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        image = cls.product_image()
+        cls.phones = Category.objects.create(name='Phones')
+        cls.laptops = Category.objects.create(name='Laptops')
+        for i, (category, price, on_sale) in enumerate([
+            (cls.phones, 500, False), (cls.phones, 800, True), (cls.phones, 3000, True), (cls.phones, 60000, False),
+            (cls.laptops, 45000, True), (cls.laptops, 70000, False),
+        ]):
+            Product.objects.create(
+                name=f'Gadget {i}', description='Gadget', category=category, image=image,
+                price=price, on_sale=on_sale, sale_price=price - 100,
+            )
+
+    def facets(self, response):
+        return {
+            facet.name: {option.value: option.count for option in facet.options}
+            for facet in response.context['facets']
+        }
+
+    def test_category_counts_exclude_their_own_selection(self):
+        url = reverse('category_products', args=[self.phones.id])
+        response = self.client.get(url + '?on_sale=1&price=under-1000')
+        self.assertEqual([product.price for product in response.context['products']], [800])
+        facets = self.facets(response)
+        # Price counts honour on_sale but not the selected price range, and vice versa
+        self.assertEqual(facets['price'], {'under-1000': 1, '1000-5000': 1, '5000-20000': 0, '20000-50000': 0, 'over-50000': 0})
+        self.assertEqual(facets['on_sale'], {'1': 1})
+        self.assertNotIn('category', facets)
+
+    def test_search_counts_come_from_two_queries(self):
+        url = reverse('search_results') + f'?q=gadget&on_sale=1&category={self.laptops.id}'
+        category_nav()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        facet_queries = [q['sql'] for q in queries.captured_queries if 'FILTER' in q['sql'] or 'GROUP BY 1, 2' in q['sql']]
+        self.assertEqual(len(facet_queries), 2)
+        self.assertEqual([product.price for product in response.context['results']], [45000])
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertEqual(self.facets(response)['category'], {str(self.laptops.id): 1, str(self.phones.id): 2})
+
+    def test_search_clear_link_keeps_the_query(self):
+        response = self.client.get(reverse('search_results'), {'q': 'gadget & co', 'on_sale': '1'})
+        self.assertContains(response, 'href="?q=gadget+%26+co" class="small text-decoration-none">Clear all</a>', html=False)
+
+
+# =====================
+# 🧵 Concurrent cart updates
+# =====================
+class ConcurrentCartTests(TransactionTestCase):
+    """Many threads change one cart at once; every change must land (SQLite runs in WAL mode here)."""
+    THREADS = 8
+    ROUNDS = 15
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper', password='pw')
+        category = Category.objects.create(name='Phones')
+        self.products = [Product.objects.create(name=f'Phone {i}', category=category, price=100) for i in range(3)]
+
+    def hammer(self, requests):
+        """Run each ``send(client)`` callable in its own thread, ROUNDS times, with the shopper logged in."""
+        errors = []
+        clients = []
+        for _ in requests:
+            client = Client()
+            client.force_login(self.user)
+            clients.append(client)
+
+        def run(client, send):
+            try:
+                for _ in range(self.ROUNDS):
+                    response = send(client)
+                    if response.status_code >= 400:
+                        errors.append(response.content)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=pair) for pair in zip(clients, requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def batch(self, *lines):
+        body = json.dumps({'lines': list(lines)})
+        return lambda client: client.post(reverse('update_cart_batch'), body, content_type='application/json')
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "SQLite only")
+    def test_sqlite_runs_in_wal_mode(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_concurrent_add_to_cart_clicks_are_not_lost(self):
+        product = self.products[0]
+        url = reverse('add_to_cart', args=[product.id])
+        self.hammer([lambda client: client.get(url)] * self.THREADS)
+        self.assertEqual(self.quantities(), {product.id: self.THREADS * self.ROUNDS})
+
+    def test_concurrent_batch_increments_are_not_lost(self):
+        send = self.batch(*({'product_id': product.id, 'delta': 1} for product in self.products))
+        self.hammer([send] * self.THREADS)
+        total = self.THREADS * self.ROUNDS
+        self.assertEqual(self.quantities(), {product.id: total for product in self.products})
+
+    def test_concurrent_increments_and_decrements_balance(self):
+        start = self.THREADS * self.ROUNDS
+        CartItem.objects.bulk_create(CartItem(user=self.user, product=product, quantity=start) for product in self.products)
+        item = CartItem.objects.get(user=self.user, product=self.products[0])
+        decrease = lambda client: client.post(reverse('update_cart', args=[item.id]), {'action': 'decrease'})
+        add = self.batch(*({'product_id': product.id, 'delta': 2} for product in self.products))
+        remove = self.batch(*({'product_id': product.id, 'delta': -1} for product in self.products[1:]))
+        half = self.THREADS // 2
+        self.hammer([add] * half + [remove, decrease] * (half // 2))
+        added, removed = half * self.ROUNDS * 2, half * self.ROUNDS // 2
+        self.assertEqual(self.quantities(), {product.id: start + added - removed for product in self.products})
+
+    def test_decrement_to_zero_removes_the_line(self):
+        product = self.products[0]
+        CartItem.objects.create(user=self.user, product=product, quantity=self.THREADS * self.ROUNDS)
+        self.hammer([self.batch({'product_id': product.id, 'delta': -1})] * self.THREADS)
+        self.assertEqual(self.quantities(), {})
+
+
+class CartBatchTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        cls.phone = Product.objects.create(name='Phone', category=category, price=100)
+        cls.sold_out = Product.objects.create(name='Sold out', category=category, price=100)
+        Inventory.objects.create(product=cls.sold_out, on_hand=0)
+        cls.user = User.objects.create_user('shopper', password='pw')
+        CartItem.objects.create(user=cls.user, product=cls.sold_out, quantity=2)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def post(self, *lines):
+        return self.client.post(reverse('update_cart_batch'), {'lines': list(lines)}, content_type='application/json')
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    def test_sold_out_products_cannot_be_added(self):
+        for line in [{'product_id': self.sold_out.id, 'delta': 1}, {'product_id': self.sold_out.id, 'quantity': 3}]:
+            with self.subTest(line=line):
+                response = self.post({'product_id': self.phone.id, 'delta': 1}, line)
+                self.assertContains(response, f'out of stock: product id(s) {self.sold_out.id}', status_code=400)
+        self.assertEqual(self.quantities(), {self.sold_out.id: 2})
+        self.assertEqual(self.post({'product_id': self.sold_out.id, 'quantity': 1}).status_code, 200)
+        self.assertEqual(self.quantities(), {self.sold_out.id: 1})
+
+    def test_out_of_range_quantities_are_rejected(self):
+        for line in [{'delta': 10 ** 20}, {'delta': -(10 ** 20)}, {'quantity': 10 ** 20}]:
+            with self.subTest(line=line):
+                response = self.post({'product_id': self.phone.id, **line})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('between', response.json()['error'])
+        self.assertEqual(self.post({'product_id': self.phone.id, 'delta': MAX_LINE_QUANTITY}).status_code, 200)
+        self.assertEqual(self.quantities()[self.phone.id], MAX_LINE_QUANTITY)
+
+
+# =====================
+# 📦 Inventory
+# =====================
+class StockTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones')
+        cls.product = Product.objects.create(name='Phone', category=category, price=100)
+        Inventory.objects.create(product=cls.product, on_hand=3)
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+
+    def stock(self):
+        return Inventory.objects.values_list('on_hand', 'reserved').get(product=self.product)
+
+    def test_reservation_holds_stock_until_it_expires(self):
+        self.assertEqual(reserve_stock(self.alice.pk, {self.product.id: 2}), set())
+        self.assertEqual(reserve_stock(self.bob.pk, {self.product.id: 2}), {self.product.id})
+        self.assertEqual(self.stock(), (3, 2))
+        # Re-reserving replaces the user's own hold instead of adding to it
+        self.assertEqual(reserve_stock(self.alice.pk, {self.product.id: 3}), set())
+        self.assertEqual(self.stock(), (3, 3))
+
+        self.assertEqual(release_expired(now=timezone.now()), 0)
+        self.assertEqual(release_expired(now=timezone.now() + timedelta(seconds=settings.STORE_RESERVATION_TTL + 1)), 1)
+        self.assertEqual(self.stock(), (3, 0))
+        self.assertEqual(reserve_stock(self.bob.pk, {self.product.id: 2}), set())
+
+    def test_checkout_takes_the_held_units(self):
+        CartItem.objects.create(user=self.alice, product=self.product, quantity=2)
+        self.client.force_login(self.alice)
+        self.client.get(reverse('checkout'))
+        self.assertEqual(self.stock(), (3, 2))
+        self.client.post(reverse('checkout'), {'name': 'Alice', 'address': 'Street', 'phone': '1', 'payment_mode': 'cod'})
+        self.assertEqual(self.stock(), (1, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_rejects_a_cart_larger_than_the_stock(self):
+        CartItem.objects.create(user=self.alice, product=self.product, quantity=4)
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('checkout'), {'name': 'Alice', 'address': 'Street', 'phone': '1'})
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        self.assertFalse(OrderGroup.objects.exists())
+        self.assertEqual(self.stock(), (3, 0))
+        self.assertTrue(CartItem.objects.filter(user=self.alice).exists())
+
+    def test_deleting_holds_in_the_admin_releases_their_stock(self):
+        reserve_stock(self.alice.pk, {self.product.id: 1})
+        reserve_stock(self.bob.pk, {self.product.id: 2})
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        alice_hold = StockReservation.objects.get(user=self.alice)
+        self.client.post(reverse('admin:store_stockreservation_delete', args=[alice_hold.pk]), {'post': 'yes'})
+        self.assertEqual(self.stock(), (3, 2))
+        self.client.post(reverse('admin:store_stockreservation_changelist'), {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': list(StockReservation.objects.values_list('pk', flat=True)),
+        })
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(self.stock(), (3, 0))
+
+    def test_untracking_a_held_product_does_not_block_checkout(self):
+        case = Product.objects.create(name='Case', category=self.product.category, price=10)
+        Inventory.objects.create(product=case, on_hand=5)
+        CartItem.objects.create(user=self.alice, product=self.product, quantity=2)
+        CartItem.objects.create(user=self.alice, product=case, quantity=1)
+        self.client.force_login(self.alice)
+        self.client.get(reverse('checkout'))
+        Inventory.objects.filter(product=case).delete()
+        self.assertEqual(reserve_stock(self.alice.pk, {self.product.id: 2, case.id: 1}), set())
+        self.client.post(reverse('checkout'), {'name': 'Alice', 'address': 'Street', 'phone': '1', 'payment_mode': 'cod'})
+        self.assertTrue(OrderGroup.objects.filter(user=self.alice).exists())
+        self.assertEqual(self.stock(), (1, 0))
+
+    def test_deleting_a_user_releases_their_holds(self):
+        reserve_stock(self.alice.pk, {self.product.id: 2})
+        self.alice.delete()
+        self.assertEqual(self.stock(), (3, 0))
+
+    def test_sold_out_set_is_cached_until_stock_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(out_of_stock_ids(), frozenset())
+        with self.assertNumQueries(0):
+            out_of_stock_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock(self.alice.pk, {self.product.id: 3})
+        self.assertEqual(out_of_stock_ids(), {self.product.id})
+
+        self.client.force_login(self.bob)
+        self.client.get(reverse('add_to_cart', args=[self.product.id]))
+        self.assertFalse(CartItem.objects.filter(user=self.bob).exists())
+
+    def test_reopening_checkout_only_extends_the_hold(self):
+        CartItem.objects.create(user=self.alice, product=self.product, quantity=1)
+        self.client.force_login(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('checkout'))
+        hold = StockReservation.objects.get(user=self.alice)
+        out_of_stock_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('checkout'))
+        with self.assertNumQueries(0):
+            out_of_stock_ids()
+        self.assertGreater(StockReservation.objects.get(pk=hold.pk).expires_at, hold.expires_at)
+        self.assertEqual(self.stock(), (3, 1))
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Buyers race for the last units of one product; exactly the stock is sold."""
+    BUYERS = 12
+    STOCK = 5
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Phones')
+        self.product = Product.objects.create(name='Hot phone', category=category, price=100)
+        Inventory.objects.create(product=self.product, on_hand=self.STOCK)
+        self.buyers = [User.objects.create_user(f'buyer{i}', password='pw') for i in range(self.BUYERS)]
+        CartItem.objects.bulk_create(CartItem(user=user, product=self.product, quantity=1) for user in self.buyers)
+
+    def test_concurrent_checkouts_never_oversell(self):
+        errors = []
+        clients = []
+        for user in self.buyers:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def checkout(client):
+            try:
+                client.get(reverse('checkout'))
+                response = client.post(reverse('checkout'), {'name': 'Buyer', 'address': 'Street', 'phone': '1'})
+                if response.status_code >= 400:
+                    errors.append(response.content)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=[client]) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        sold = OrderItem.objects.filter(product=self.product).aggregate(units=Sum('quantity'))['units']
+        self.assertEqual(sold, self.STOCK)
+        self.assertEqual(OrderGroup.objects.count(), self.STOCK)
+        self.assertEqual(Inventory.objects.values_list('on_hand', 'reserved').get(product=self.product), (0, 0))
+        self.assertFalse(StockReservation.objects.exists())
@@ -1,9 +1,15 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+
+# Under the ASGI profile the read-heavy pages are served by their async versions
+catalog_views = views
+if settings.STORE_ASYNC_VIEWS:
+    from . import async_views as catalog_views
 
 urlpatterns = [
     # 🔹 Static Pages
-    path("", views.home, name='home'),
+    path("", catalog_views.home, name='home'),
     path("about/", views.about, name="about"),
     
 
@@ -13,15 +19,17 @@ urlpatterns = [
     path("register/", views.register, name='register'),
 
     # 🔹 Product Pages
-    path("product/<int:pk>/", views.product, name='product'),
-    path("categories/", views.categories, name='categories'),
-    path("categories/<int:category_id>/", views.categories, name='category_products'),
+    path("product/<int:pk>/", catalog_views.product, name='product'),
+    path("products/page/", catalog_views.product_page, name='product_page'),
+    path("categories/", catalog_views.categories, name='categories'),
+    path("categories/<int:category_id>/", catalog_views.categories, name='category_products'),
 
     # 🔹 Cart Operations
     path("add-to-cart/<int:product_id>/", views.add_to_cart, name='add_to_cart'),
     path("cart/", views.cart_view, name='cart'),
     path("checkout/", views.checkout_view, name='checkout'),
     path("cart/update/<int:item_id>/", views.update_cart_quantity, name="update_cart"),
+    path("cart/batch/", views.update_cart_batch, name="update_cart_batch"),
 
     # 🔹 Wishlist Operations
     path("wishlist/", views.wishlist_view, name='wishlist_view'),
@@ -32,5 +40,11 @@ urlpatterns = [
     path("product/<int:product_id>/review/", views.submit_review, name='submit_review'),
 
     # 🔹 Search
-    path("search/", views.search_results, name='search_results'),
+    path("search/", catalog_views.search_results, name='search_results'),
+
+    # 🔹 JSON API (read-only catalog)
+    path("api/v1/products/", api.products, name='api_products'),
+    path("api/v1/products/<int:pk>/", api.product, name='api_product'),
+    path("api/v1/products/<int:pk>/reviews/", api.product_reviews, name='api_product_reviews'),
+    path("api/v1/categories/", api.categories, name='api_categories'),
 ]
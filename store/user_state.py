@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import acatalog_version, catalog_version
+from .cart import cart_lines
+from .models import Wishlist
+
+# =====================
+# 👤 Per-user cart/wishlist state
+# =====================
+# Listing pages need to know which products the visitor already has in their cart
+# or wishlist. The product ids are loaded once, cached per user and memoized on the
+# request, so each card does an O(1) set lookup and repeated renders cost no queries.
+# The same entry carries the cart badge numbers (line count and subtotal), so the
+# navbar costs nothing on a cache hit. The subtotal depends on current prices, so
+# the key includes the catalog version and a price change starts a fresh entry.
+# Every code path that mutates a cart or wishlist (views, checkout, admin) must
+# call invalidate_user_state().
+
+CACHE_TIMEOUT = 60 * 15
+
+
+class UserState:
+    def __init__(self, cart_quantities=None, wishlist=(), cart_subtotal=Decimal('0.00')):
+        self.cart_quantities = dict(cart_quantities or {})  # {product_id: quantity}
+        self.cart = frozenset(self.cart_quantities)
+        self.wishlist = frozenset(wishlist)
+        self.cart_subtotal = cart_subtotal
+
+    @property
+    def cart_count(self):
+        return len(self.cart_quantities)
+
+
+ANONYMOUS_STATE = UserState()
+
+
+def _cache_key(version, user_id):
+    return f'store:user_state:{version}:{user_id}'
+
+
+def get_user_state(request):
+    state = getattr(request, '_store_user_state', None)
+    if state is None:
+        if request.user.is_authenticated:
+            state = load_user_state(request.user.pk, request)
+        else:
+            state = ANONYMOUS_STATE
+        request._store_user_state = state
+    return state
+
+
+def load_user_state(user_id, request=None):
+    key = _cache_key(catalog_version(request), user_id)
+    data = cache.get(key)
+    if data is None:
+        data = _state_data(
+            cart_lines(user_id).values_list('product_id', 'quantity', 'line_total'),
+            Wishlist.objects.filter(user_id=user_id).values_list('product_id', flat=True),
+        )
+        cache.set(key, data, CACHE_TIMEOUT)
+    return UserState(data['cart'], data['wishlist'], data['cart_subtotal'])
+
+
+async def aget_user_state(request):
+    """Async get_user_state(); also resolves ``request.user`` so templates can read it without a query."""
+    state = getattr(request, '_store_user_state', None)
+    if state is None:
+        request.user = await request.auser()
+        if request.user.is_authenticated:
+            state = await aload_user_state(request.user.pk, request)
+        else:
+            state = ANONYMOUS_STATE
+        request._store_user_state = state
+    return state
+
+
+async def aload_user_state(user_id, request=None):
+    key = _cache_key(await acatalog_version(request), user_id)
+    data = await cache.aget(key)
+    if data is None:
+        cart = [row async for row in cart_lines(user_id).values_list('product_id', 'quantity', 'line_total')]
+        wishlist = [pk async for pk in Wishlist.objects.filter(user_id=user_id).values_list('product_id', flat=True)]
+        data = _state_data(cart, wishlist)
+        await cache.aset(key, data, CACHE_TIMEOUT)
+    return UserState(data['cart'], data['wishlist'], data['cart_subtotal'])
+
+
+def _state_data(cart_rows, wishlist_ids):
+    cart = {}
+    subtotal = Decimal('0.00')
+    for product_id, quantity, line_total in cart_rows:
+        cart[product_id] = quantity
+        subtotal += line_total
+    return {'cart': cart, 'cart_subtotal': subtotal, 'wishlist': list(wishlist_ids)}
+
+
+def invalidate_user_state(user_id):
+    """Drop the cached state once the surrounding transaction (if any) has committed."""
+    transaction.on_commit(lambda: cache.delete(_cache_key(catalog_version(), user_id)))
@@ -1,57 +1,83 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.db.models import Q, Value
-from django.db.models.functions import Replace, Lower
-from datetime import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.views.decorators.http import require_POST
+import json
+import uuid
+from urllib.parse import urlencode
 
 from .forms import SignupForm
-from .models import Category, Product, CartItem, OrderGroup, OrderItem, Wishlist, Review
+from .models import Product, CartItem, Wishlist, Review
+from .caching import anonymous_page_cache
+from .cart import add_cart_quantities, apply_cart_changes, cart_summary, parse_cart_changes, remove_cart_quantity
+from .facets import FacetFilters, build_facets, facet_counts
+from .inventory import OutOfStock, out_of_stock_ids, reserve_stock
+from .middleware import VISIT_COOKIE, get_visit_info
+from .navigation import category_nav, get_nav_category_or_404
+from .orders import place_order
+from .pagination import keyset_page
+from .search import matching_products, search_page
+from .user_state import get_user_state, invalidate_user_state
 
 # 🔹 Home Page
+@anonymous_page_cache
 def home(request):
-    request.session['last_visit'] = str(datetime.now())
-    request.session['visit_count'] = request.session.get('visit_count', 0) + 1
-    products = Product.objects.all()
+    # Visits are counted by store.middleware.VisitTrackingMiddleware (signed cookie, no DB write)
+    page = _product_page(request, Product.objects.select_related('category'))
 
-    cart_products = []
-    wishlist_products = []
-    if request.user.is_authenticated:
-        cart_products = CartItem.objects.filter(user=request.user).values_list('product_id', flat=True)
-        wishlist_products = Wishlist.objects.filter(user=request.user).values_list('product_id', flat=True)
+    state = get_user_state(request)
 
     return render(request, "store/home.html", {
-        'Products': products,
-        'cart_products': cart_products,
-        'wishlist_products': wishlist_products
+        'Products': page,
+        'page': page,
+        'cart_products': state.cart,
+        'wishlist_products': state.wishlist
     })
 
+# 🔹 Product Grid Fragment (infinite scroll)
+@anonymous_page_cache
+def product_page(request):
+    page = _product_page(request, Product.objects.select_related('category'))
+
+    state = get_user_state(request)
+
+    return render(request, "store/product_cards.html", {
+        'Products': page,
+        'page': page,
+        'cart_products': state.cart,
+        'wishlist_products': state.wishlist
+    })
+
+def _product_page(request, queryset):
+    return keyset_page(queryset, sort=request.GET.get('sort'), cursor=request.GET.get('cursor'))
+
 # 🔹 About Page
 def about(request):
-    last_visit = request.session.get('last_visit', 'Never visited before!')
-    visit_count = request.session.get('visit_count', 0)
+    last_visit, visit_count = get_visit_info(request)
     return render(request, "store/about.html", {
-        'last_visit': last_visit,
+        'last_visit': last_visit or 'Never visited before!',
         'visit_count': visit_count
     })
 
 # 🔹 Product Detail Page
+@anonymous_page_cache
 def product(request, pk):
     product = get_object_or_404(Product, id=pk)
-    is_in_cart = is_in_wishlist = False
-    reviews = Review.objects.filter(product=product).order_by('-created_at')
-
-    if request.user.is_authenticated:
-        is_in_cart = CartItem.objects.filter(user=request.user, product=product).exists()
-        is_in_wishlist = Wishlist.objects.filter(user=request.user, product=product).exists()
+    reviews = Review.objects.filter(product=product).select_related('user').order_by('-created_at')
+    state = get_user_state(request)
 
     return render(request, "store/product.html", {
         'product': product,
-        'is_in_cart': is_in_cart,
-        'is_in_wishlist': is_in_wishlist,
+        'is_in_cart': product.id in state.cart,
+        'cart_quantity': state.cart_quantities.get(product.id, 0),
+        'is_in_wishlist': product.id in state.wishlist,
+        'is_out_of_stock': product.id in out_of_stock_ids(request),
         'reviews': reviews,
         'average_rating': product.average_rating
 
@@ -65,11 +91,13 @@ def submit_review(request, product_id):
         rating = int(request.POST.get("rating"))
         comment = request.POST.get("comment")
 
-        Review.objects.update_or_create(
-            user=request.user,
-            product=product,
-            defaults={"rating": rating, "comment": comment}
-        )
+        # Rating aggregates on Product are refreshed by store.signals in this same transaction
+        with transaction.atomic():
+            Review.objects.update_or_create(
+                user=request.user,
+                product=product,
+                defaults={"rating": rating, "comment": comment}
+            )
         messages.success(request, "Thank you! Your review has been submitted.")
         return redirect('product', pk=product.id)
     return redirect('home')
@@ -92,10 +120,10 @@ def login_user(request):
 # 🔹 Logout
 def logout_user(request):
     logout(request)
-    request.session.pop('last_visit', None)
-    request.session.pop('visit_count', None)
     messages.success(request, "You have been logged out.")
-    return redirect("home")
+    response = redirect("home")
+    response.delete_cookie(VISIT_COOKIE)
+    return response
 
 # 🔹 Register
 def register(request):
@@ -132,155 +160,207 @@ def register(request):
     return render(request, 'store/register.html')
 
 # 🔹 Categories
+@anonymous_page_cache
 def categories(request, category_id=None):
-    all_categories = Category.objects.all()
+    all_categories = category_nav(request)
     current_category = None
     products = []
+    filters = FacetFilters(request.GET, with_category=False)
+    facets = []
 
     if category_id:
-        current_category = get_object_or_404(Category, id=category_id)
-        products = Product.objects.filter(category=current_category)
+        current_category = get_nav_category_or_404(all_categories, category_id)
+        in_category = Product.objects.filter(category_id=category_id)
+        products = _product_page(request, in_category.filter(filters.q()).select_related('category'))
+        counts = facet_counts(request, f'category:{category_id}', in_category, filters)
+        facets = build_facets(counts, filters, extra=[('sort', products.sort)])
 
-    wishlist_products = []
-    cart_products = []
-    if request.user.is_authenticated:
-        wishlist_products = Wishlist.objects.filter(user=request.user).values_list('product_id', flat=True)
-        cart_products = CartItem.objects.filter(user=request.user).values_list('product_id', flat=True)
+    state = get_user_state(request)
 
     return render(request, "store/categories.html", {
         'all_categories': all_categories,
         'current_category': current_category,
         'products': products,
-        'wishlist_products': wishlist_products,
-        'cart_products': cart_products
+        'filters': filters,
+        'facets': facets,
+        'wishlist_products': state.wishlist,
+        'cart_products': state.cart
     })
 
 # 🔹 Add to Cart
 @login_required
 def add_to_cart(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    cart_item, created = CartItem.objects.get_or_create(user=request.user, product=product)
-    if not created:
-        cart_item.quantity += 1
-    cart_item.save()
+    product = get_object_or_404(Product.objects.only('name'), id=product_id)
+    if product.id in out_of_stock_ids(request):
+        messages.warning(request, f"{product.name} is out of stock.")
+        return redirect(request.META.get('HTTP_REFERER', 'cart'))
+    # One upsert: concurrent clicks each add 1 instead of overwriting each other
+    add_cart_quantities(request.user.pk, {product.id: 1})
+    invalidate_user_state(request.user.pk)
     messages.success(request, f"{product.name} added to cart.")
     return redirect(request.META.get('HTTP_REFERER', 'cart'))
 
 # 🔹 Cart View
 @login_required
 def cart_view(request):
-    items = CartItem.objects.filter(user=request.user)
-    total = sum(item.total_price() for item in items)
-    return render(request, 'store/cart.html', {'items': items, 'total': total})
+    summary = cart_summary(request.user.pk)
+    return render(request, 'store/cart.html', {'items': summary.lines, 'total': summary.subtotal, 'summary': summary})
 
 # 🔹 Checkout
 @login_required
 def checkout_view(request):
-    items = CartItem.objects.filter(user=request.user)
-    total = sum(item.total_price() for item in items)
-
-    if not items.exists():
-        messages.warning(request, "Your cart is empty. Add items before checkout.")
-        return redirect('cart')
-
     if request.method == "POST":
         name = request.POST.get("name")
         address = request.POST.get("address")
         phone = request.POST.get("phone")
-        payment_mode = request.POST.get("payment_mode")
-
-        order_group = OrderGroup.objects.create(
-            user=request.user,
-            total_price=total,
-            is_paid=True if payment_mode.lower() == 'online' else False,
-            shipping_address=address,
-            phone=phone
-        )
-
-        for item in items:
-            OrderItem.objects.create(
-                order=order_group,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price
+        payment_mode = request.POST.get("payment_mode") or ''
+
+        try:
+            order_group, created = place_order(
+                request.user,
+                shipping_address=address,
+                phone=phone,
+                is_paid=payment_mode.lower() == 'online',
+                customer_name=name,
+                idempotency_key=request.POST.get("idempotency_key"),
             )
-
-        items.delete()
-
-        send_mail(
-            subject='🛒 Order Confirmation',
-            message=f"Hi {name}, your order has been placed successfully!",
-            from_email=None,
-            recipient_list=[request.user.email],
-            fail_silently=False,
-        )
-
-        messages.success(request, f"Order placed! Confirmation sent to {request.user.email}")
+        except OutOfStock as exc:
+            names = Product.objects.filter(id__in=exc.product_ids).values_list('name', flat=True)
+            messages.error(request, f"Sorry, not enough stock left for: {', '.join(names)}. Please update your cart.")
+            return redirect('cart')
+        if order_group is None:
+            messages.warning(request, "Your cart is empty. Add items before checkout.")
+            return redirect('cart')
+        if not created:
+            messages.info(request, f"Order #{order_group.id} has already been placed.")
+            return redirect('home')
+
+        messages.success(request, f"Order placed! A confirmation will be sent to {request.user.email}")
         return redirect('home')
 
-    return render(request, 'store/checkout.html', {'items': items, 'total': total})
+    summary = cart_summary(request.user.pk)
+    if not summary:
+        messages.warning(request, "Your cart is empty. Add items before checkout.")
+        return redirect('cart')
+
+    # Hold the cart's stock while the customer fills in the form (released after STORE_RESERVATION_TTL)
+    short = reserve_stock(request.user.pk, {line.product_id: line.quantity for line in summary.lines})
+    if short:
+        names = [line.product.name for line in summary.lines if line.product_id in short]
+        messages.warning(request, f"Not enough stock left for: {', '.join(names)}. Please update your cart.")
+
+    return render(request, 'store/checkout.html', {
+        'items': summary.lines,
+        'total': summary.subtotal,
+        'summary': summary,
+        'idempotency_key': uuid.uuid4().hex
+    })
 
 # 🔹 Update Cart Quantity
 @login_required
 def update_cart_quantity(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id, user=request.user)
-
     if request.method == 'POST':
+        lines = CartItem.objects.filter(id=item_id, user=request.user)
         action = request.POST.get('action')
         if action == 'increase':
-            cart_item.quantity += 1
+            matched = lines.update(quantity=F('quantity') + 1)
         elif action == 'decrease':
-            cart_item.quantity -= 1
-            if cart_item.quantity <= 0:
-                cart_item.delete()
-                return redirect('cart')
-        cart_item.save()
+            matched = remove_cart_quantity(lines)
+        else:
+            return redirect('cart')
+        if not matched:
+            raise Http404("No CartItem matches the given query.")
+        invalidate_user_state(request.user.pk)
     return redirect('cart')
 
+# 🔹 Batch Cart Update (JSON)
+@login_required
+@require_POST
+def update_cart_batch(request):
+    """Apply ``{"lines": [{"product_id": 1, "delta": 2}, {"product_id": 3, "quantity": 0}]}`` in one transaction."""
+    try:
+        deltas, quantities = parse_cart_changes(json.loads(request.body or b'null'))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    product_ids = deltas.keys() | quantities.keys()
+    unknown = product_ids - set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+    if unknown:
+        return JsonResponse({'error': f"unknown product id(s): {', '.join(map(str, sorted(unknown)))}"}, status=400)
+    # Like add_to_cart, a sold-out product can't be added; lowering or removing its line is fine
+    sold_out = product_ids & out_of_stock_ids(request)
+    if sold_out:
+        in_cart = dict(
+            CartItem.objects.filter(user=request.user, product_id__in=sold_out).values_list('product_id', 'quantity')
+        )
+        growing = sorted(
+            product_id for product_id in sold_out
+            if deltas.get(product_id, 0) > 0 or quantities.get(product_id, 0) > in_cart.get(product_id, 0)
+        )
+        if growing:
+            return JsonResponse({'error': f"out of stock: product id(s) {', '.join(map(str, growing))}"}, status=400)
+
+    apply_cart_changes(request.user.pk, deltas, quantities)
+    invalidate_user_state(request.user.pk)
+
+    summary = cart_summary(request.user.pk)
+    return JsonResponse({
+        'lines': [
+            {'product_id': line.product_id, 'quantity': line.quantity, 'unit_price': line.unit_price, 'line_total': line.line_total}
+            for line in summary.lines
+        ],
+        'subtotal': summary.subtotal,
+        'item_count': summary.item_count,
+    })
+
 # ⭐ Wishlist Functionality
 @login_required
 def add_to_wishlist(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     Wishlist.objects.get_or_create(user=request.user, product=product)
+    invalidate_user_state(request.user.pk)
     messages.success(request, f"{product.name} added to your wishlist.")
     return redirect(request.META.get('HTTP_REFERER', 'home'))
 
 @login_required
 def wishlist_view(request):
-    wishlist_items = Wishlist.objects.filter(user=request.user)
+    wishlist_items = Wishlist.objects.filter(user=request.user).select_related('product')
     return render(request, 'store/wishlist.html', {'wishlist_items': wishlist_items})
 
 @login_required
 def remove_from_wishlist(request, product_id):
     Wishlist.objects.filter(user=request.user, product_id=product_id).delete()
+    invalidate_user_state(request.user.pk)
     messages.success(request, "Item removed from wishlist.")
     return redirect('wishlist_view')
 
 # 🔍 Search
+@anonymous_page_cache
 def search_results(request):
     query = request.GET.get('q', '').strip()
 
+    page_obj = None
+    results = []
+    filters = FacetFilters(request.GET)
+    facets = []
     if query:
-        normalized_query = query.replace(" ", "").lower()
-        results = Product.objects.annotate(
-            norm_name=Lower(Replace('name', Value(' '), Value(''))),
-            norm_desc=Lower(Replace('description', Value(' '), Value('')))
-        ).filter(
-            Q(norm_name__icontains=normalized_query) |
-            Q(norm_desc__icontains=normalized_query)
+        counts = facet_counts(request, f'search:{query}', matching_products(query), filters)
+        facets = build_facets(counts, filters, extra=[('q', query)])
+        # The facet query already counted the filtered matches, so the paginator needn't
+        page_obj = search_page(
+            query, request.GET.get('page'), settings.STORE_PAGE_SIZE, filters.q('product__'), count=counts['count_total'],
         )
-    else:
-        results = []
+        results = page_obj.object_list
 
-    wishlist_products = []
-    cart_products = []
-    if request.user.is_authenticated:
-        wishlist_products = Wishlist.objects.filter(user=request.user).values_list('product_id', flat=True)
-        cart_products = CartItem.objects.filter(user=request.user).values_list('product_id', flat=True)
+    state = get_user_state(request)
 
     return render(request, 'store/search_results.html', {
         'query': query,
         'results': results,
-        'wishlist_products': wishlist_products,
-        'cart_products': cart_products
+        'page_obj': page_obj,
+        'filters': filters,
+        'facets': facets,
+        'base_query': urlencode({'q': query}),
+        'wishlist_products': state.wishlist,
+        'cart_products': state.cart
     })